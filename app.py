@@ -1,28 +1,60 @@
+import asyncio
 import os
+import statistics
+from contextlib import contextmanager
+from functools import lru_cache
+from cryptography.fernet import Fernet
 from dotenv import load_dotenv
+from eth_account import Account
 from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
-from telegram.ext import Application, CommandHandler, ContextTypes, CallbackQueryHandler, ConversationHandler, \
-    MessageHandler, filters
-from web3 import Web3
-import json
+from telegram.error import TelegramError
+from telegram.ext import AIORateLimiter, Application, CommandHandler, ContextTypes, CallbackQueryHandler, \
+    ConversationHandler, MessageHandler, filters
+from web3 import AsyncWeb3
+from web3.exceptions import ContractLogicError, TimeExhausted, TransactionNotFound, Web3RPCError
 import logging
-from sqlalchemy import create_engine, Column, Integer, String, Float
+import pickle
+import orjson
+from dataclasses import dataclass
+from argon2 import PasswordHasher
+from cachetools import LRUCache
+from sqlalchemy import create_engine, event, bindparam, func, select, BigInteger, Boolean, Column, Index, Integer, \
+    LargeBinary, String
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
 
+from utils.balance_batcher import BalanceBatcher
+from utils.errand_index import ErrandIndex
 from utils.gas_manager import GasTracker
+from utils.migrations import fill_column, rebuild_table, rewrite_column, vacuum
+from utils.multicall import Multicall
+from utils.nonce_manager import NonceManager
+from utils.receipt_waiter import ReceiptWaiter
+from utils.single_flight import SingleFlight
+from utils.rpc_provider import OrjsonAsyncHTTPProvider
+from utils.telegram_request import KeepAliveHTTPXRequest
+from utils.update_processor import PerConversationUpdateProcessor
 
 # Set up logging
 logging.basicConfig(format='%(asctime)s - %(name)s - %(levelname)s - %(message)s', level=logging.INFO)
 logger = logging.getLogger(__name__)
+# httpx logs every request at INFO; with all RPC and Bot API traffic on it that is a line per call
+logging.getLogger("httpx").setLevel(logging.WARNING)
 
 # Load environment variables
 load_dotenv()
 BOT_TOKEN = os.getenv('TELEGRAM_BOT_TOKEN')
-CONTRACT_ADDRESS = os.getenv('CONTRACT_ADDRESS')
+CONTRACT_ADDRESS = AsyncWeb3.to_checksum_address(os.getenv('CONTRACT_ADDRESS'))
 CHAINSTACK_NODE_URL = os.getenv('CHAINSTACK_NODE_URL')
+CHAINSTACK_WSS_URL = os.getenv('CHAINSTACK_WSS_URL')
 FAUCET_ADDRESS = os.getenv('FAUCET_ADDRESS')
 FAUCET_PRIVATE_KEY = os.getenv('FAUCET_PRIVATE_KEY')
+# Optional Chainlink ETH/USD aggregator used to size faucet transfers
+ETH_USD_FEED_ADDRESS = os.getenv('ETH_USD_FEED_ADDRESS')
+WALLET_ENCRYPTION_KEY = os.getenv('WALLET_ENCRYPTION_KEY')
+if not WALLET_ENCRYPTION_KEY:
+    raise Exception("WALLET_ENCRYPTION_KEY must be set to encrypt wallet keys")
+# Only needed to migrate wallets that an older version stored as V3 keystores
+KEYSTORE_PASSWORD = os.getenv('KEYSTORE_PASSWORD')
 
 # Database setup
 DB_URL = "sqlite:///users.db"
@@ -31,77 +63,582 @@ Base = declarative_base()
 
 class User(Base):
     __tablename__ = 'users'
-    id = Column(Integer, primary_key=True)
-    telegram_id = Column(String, unique=True)
-    wallet_address = Column(String)
-    balance = Column(Float, default=0.0)
+    # Telegram IDs fit in 64 bits; on SQLite this becomes an INTEGER PRIMARY KEY, i.e. the rowid itself
+    telegram_id = Column(BigInteger().with_variant(Integer, "sqlite"), primary_key=True, autoincrement=False)
+    # Raw 20-byte address: half the row space of the hex string, checksummed once when cached
+    wallet = Column(LargeBinary(20))
     password = Column(String)
-    private_key = Column(String)
+    encrypted_key = Column(LargeBinary)
+    # Next free nonce for the wallet, so a restart doesn't have to ask the node again
+    nonce = Column(Integer)
 
 
-engine = create_engine(DB_URL)
+class Errand(Base):
+    __tablename__ = 'errands'
+    # Off-chain copy of the contract's errands, so listing them is a local query rather than a chain scan
+    id = Column(Integer, primary_key=True, autoincrement=False)
+    description = Column(String)
+    # uint256 doesn't fit SQLite's 64-bit INTEGER, so the reward is kept as its decimal string
+    reward = Column(String)
+    completed = Column(Boolean, nullable=False, default=False)
+    __table_args__ = (Index('ix_errands_open', 'completed', 'id'),)
+
+
+class SyncState(Base):
+    __tablename__ = 'sync_state'
+    # Last block each chain-derived table has been brought up to
+    name = Column(String, primary_key=True)
+    block = Column(Integer, nullable=False)
+
+
+# Keep a warm pool of SQLite connections instead of reconnecting per lookup; a local file
+# connection never goes stale, so there is no pre-ping or recycling on checkout
+engine = create_engine(
+    DB_URL,
+    pool_size=10,
+    max_overflow=20,
+    pool_timeout=5,
+    pool_use_lifo=True,
+    connect_args={"check_same_thread": False},
+)
+
+
+@event.listens_for(engine, "connect")
+def set_sqlite_pragmas(dbapi_connection, connection_record):
+    """Relax fsyncs to once per WAL checkpoint and keep temp data and hot pages in memory."""
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA synchronous=NORMAL")
+    cursor.execute("PRAGMA temp_store=MEMORY")
+    cursor.execute("PRAGMA mmap_size=134217728")
+    cursor.execute("PRAGMA cache_size=-65536")
+    cursor.close()
+
+
+# WAL lets readers run alongside a writer; the mode is stored in the database file, so it is set once here
+# rather than on every new pooled connection
+with engine.connect() as connection:
+    connection.exec_driver_sql("PRAGMA journal_mode=WAL")
+
+
+# Wallet keys are stored as Fernet tokens (AES via OpenSSL plus an HMAC); a decrypt costs microseconds,
+# not the tens of milliseconds a scrypt keystore took
+fernet = Fernet(WALLET_ENCRYPTION_KEY)
+
+
+def encrypt_private_key(private_key):
+    """Encrypt a raw wallet key with the server's Fernet key."""
+    return fernet.encrypt(bytes(private_key))
+
+
+def encrypt_legacy_private_key(private_key):
+    """Encrypt a legacy plaintext wallet key, stored either as hex or as raw bytes."""
+    if isinstance(private_key, str):
+        private_key = bytes.fromhex(private_key.removeprefix('0x'))
+    return encrypt_private_key(private_key)
+
+
+def reencrypt_keystore(keystore):
+    """Move a legacy V3 keystore over to Fernet."""
+    if not KEYSTORE_PASSWORD:
+        raise Exception("KEYSTORE_PASSWORD must be set to migrate keystore-encrypted wallet keys")
+    return encrypt_private_key(Account.decrypt(keystore, KEYSTORE_PASSWORD))
+
+
+# Argon2id hashing costs tens of ms of CPU, so it always runs in a worker thread
+password_hasher = PasswordHasher(time_cost=2, memory_cost=19 * 1024, parallelism=1)
+
+
+def address_bytes(wallet_address):
+    """Pack a hex wallet address into its 20 raw bytes."""
+    return bytes.fromhex(wallet_address.removeprefix('0x').removeprefix('0X'))
+
+
+migrated = [
+    fill_column(engine, User.__table__, 'wallet_address', 'wallet', address_bytes),
+    fill_column(engine, User.__table__, 'private_key', 'encrypted_key', encrypt_legacy_private_key),
+    fill_column(engine, User.__table__, 'keystore', 'encrypted_key', reencrypt_keystore),
+    rebuild_table(engine, User.__table__, casts={'telegram_id': 'INTEGER'}),
+    # Passwords saved before hashing was introduced are still plaintext; hash them in place
+    rewrite_column(engine, User.__table__, 'password', password_hasher.hash, lambda value: not value.startswith('$argon2')),
+]
+if any(migrated):
+    # Dropped legacy columns and overwritten plaintext linger in freed pages until the file is rewritten
+    vacuum(engine)
 Base.metadata.create_all(engine)
-Session = sessionmaker(bind=engine)
 
-# Web3 setup
-web3 = Web3(Web3.HTTPProvider(CHAINSTACK_NODE_URL))
-if not web3.is_connected():
-    raise Exception("Failed to connect to Ethereum network")
+
+@dataclass(frozen=True)
+class CachedUser:
+    """Detached snapshot of the user fields the handlers need."""
+    telegram_id: int
+    wallet_address: str
+    encrypted_key: bytes
+
+
+# The two per-user hot paths go straight to the pooled sqlite3 connection, whose statement cache keeps them prepared
+USER_INSERT_SQL = "INSERT INTO users (telegram_id, wallet, encrypted_key) VALUES (?, ?, ?)"
+USER_LOOKUP_SQL = "SELECT wallet, encrypted_key FROM users WHERE telegram_id = ?"
+
+# Core statements for the remaining users-table access: each helper checks out one pooled connection and
+# runs a precompiled statement, with no ORM Session, identity map or unit-of-work tracking
+USER_SET_PASSWORD = User.__table__.update().where(User.telegram_id == bindparam("tid")).values(password=bindparam("password"))
+USER_NONCE = select(User.nonce).where(User.telegram_id == bindparam("tid"))
+# Completions of concurrent sends can land out of order, so the stored nonce only ever moves forward
+USER_SET_NONCE = User.__table__.update().where(User.telegram_id == bindparam("tid")).values(
+    nonce=func.max(func.coalesce(User.nonce, 0), bindparam("nonce"))
+)
+USER_CLEAR_NONCE = User.__table__.update().where(User.telegram_id == bindparam("tid")).values(nonce=None)
+
+# In-process caches for hot lookups on the callback path
+# A user's wallet and key never change once created, so entries only leave the cache by LRU eviction
+_user_cache = LRUCache(maxsize=10_000)
+# Chain reads shared by concurrent callers and kept briefly, so bursts of identical taps cost one RPC
+balance_reads = SingleFlight(ttl=15)
+stats_reads = SingleFlight(ttl=2)
+# Decrypted wallet keys, so each Fernet token is opened once per user rather than once per transaction
+_private_key_cache = LRUCache(maxsize=1024)
+# EIP-1559 fee caps, reused for about six Base blocks; twice the base fee covers its growth over that span
+fee_reads = SingleFlight(ttl=12, maxsize=1)
+# Users seen registered on-chain; registration can't be undone, so /start stops re-checking them
+_registered_users = set()
+
+# Cap on open connections to the node so a burst of concurrent updates doesn't flood it
+RPC_CONCURRENCY = 32
+
+# Web3 setup: AsyncWeb3 keeps RPC round-trips off the event loop and the provider frames JSON-RPC
+# with orjson over one long-lived HTTP/2 keep-alive client, so every call shares the same connection.
+# eth_chainId never changes for the process, so the provider answers web3's own chain id checks from cache
+web3 = AsyncWeb3(OrjsonAsyncHTTPProvider(
+    CHAINSTACK_NODE_URL,
+    max_connections=RPC_CONCURRENCY,
+    cache_allowed_requests=True,
+    cacheable_requests={'eth_chainId'},
+))
+
+# One shared poller batches eth_getTransactionReceipt for every pending transaction, once per
+# new block when a WebSocket endpoint is configured and otherwise every 2 s, Base's block time
+receipt_waiter = ReceiptWaiter(web3, poll_interval=2.0, ws_url=CHAINSTACK_WSS_URL)
+
+
+
+def load_abi_cached(path):
+    """Load a contract ABI, reusing a pickled copy while the JSON file is unchanged."""
+    cache_path = path + '.pkl'
+    mtime = os.stat(path).st_mtime_ns
+    try:
+        with open(cache_path, 'rb') as cache_file:
+            cached_mtime, abi = pickle.load(cache_file)
+        if cached_mtime == mtime:
+            return abi
+    except (OSError, EOFError, ValueError, pickle.UnpicklingError):
+        pass
+
+    with open(path, 'rb') as abi_file:
+        abi = orjson.loads(abi_file.read())
+    try:
+        with open(cache_path, 'wb') as cache_file:
+            pickle.dump((mtime, abi), cache_file)
+    except OSError as e:
+        logger.warning(f"Could not write ABI cache {cache_path}: {e}")
+    return abi
+
 
 # Load contract ABI
-with open('contracts/contract.abi.json', 'r') as abi_file:
-    contract_abi = json.load(abi_file)
+contract_abi = load_abi_cached('contracts/contract.abi.json')
 contract = web3.eth.contract(address=CONTRACT_ADDRESS, abi=contract_abi)
-
-# Initialize GasTracker
-gas_tracker = GasTracker(CHAINSTACK_NODE_URL, FAUCET_ADDRESS, FAUCET_PRIVATE_KEY)
+multicall = Multicall(web3, load_abi_cached('contracts/multicall3.abi.json'))
+
+# Fixed for the life of the process: chain id is read once in post_init, registerUser() takes no arguments
+CHAIN_ID = None
+REGISTER_USER_CALLDATA = contract.encode_abi('registerUser')
+
+# Contract function factories bound once, so handlers skip the ABI lookup on every call
+FN_BALANCE_OF = contract.functions.balanceOf
+FN_REGISTER_USER = contract.functions.registerUser
+FN_RECYCLE = contract.functions.recycleEWaste
+FN_CREATE_ERRAND = contract.functions.createErrand
+FN_GET_ERRAND = contract.functions.getErrand
+FN_USERS = contract.functions.users
+FN_REPUTATION = contract.functions.getUserReputation
+FN_RECYCLED_AMOUNT = contract.functions.getUserRecycledAmount
+FN_COMPLETE_ERRAND = contract.functions.completeErrand
+FN_REGISTER_BUYER = contract.functions.registerBuyer
+FN_PROCESS_EWASTE = contract.functions.processEWaste
+FN_PAY = contract.functions.payForEWaste
+FN_TRANSFER = contract.functions.transfer
+EV_ERRAND_CREATED = contract.events.ErrandCreated()
+
+# Concurrent balance reads from different users are coalesced into one Multicall3 call per 30 ms window
+balance_batcher = BalanceBatcher(multicall, FN_BALANCE_OF, window=0.03)
+
+# Upper bound on errand reads per Multicall3 call, keeping each eth_call well inside node gas and size limits
+ERRAND_BATCH_SIZE = 500
+ERRANDS_PER_PAGE = 20
+
+# Open errands are listed from SQLite, brought up to date from contract logs at most every few seconds
+errand_index = ErrandIndex(
+    web3, contract, multicall, engine, Errand.__table__, SyncState.__table__, batch_size=ERRAND_BATCH_SIZE
+)
 
 # Define conversation states
 (TERMS, PASSWORD, MAIN_MENU, EARN, BUYER, WALLET, DONATE, REGISTER, CLAIM_GAS,
  RECYCLE, CREATE_ERRAND, COMPLETE_ERRAND, REGISTER_BUYER, PROCESS_EWASTE, PAY_FOR_EWASTE) = range(15)
 
+# Pending on-chain registrations, drained by registration_worker
+REGISTRATION_BATCH_SIZE = 8
+registration_queue = asyncio.Queue()
+background_tasks = set()
+
+# Pre-generated wallets so signup doesn't run secp256k1 keygen on the event loop
+ACCOUNT_POOL_SIZE = 32
+account_pool = asyncio.Queue(maxsize=ACCOUNT_POOL_SIZE)
+
+# Static keyboards, built once and shared by every callback
+TERMS_MARKUP = InlineKeyboardMarkup([
+    [InlineKeyboardButton("✅ I Agree", callback_data='agree')],
+    [InlineKeyboardButton("❌ I Disagree", callback_data='disagree')]
+])
+
+MAIN_MENU_MARKUP = InlineKeyboardMarkup([
+    [InlineKeyboardButton("💰 Earn & Recycle", callback_data='earn')],
+    [InlineKeyboardButton("🛒 Buyer Zone", callback_data='buyer')],
+    [InlineKeyboardButton("👛 My Wallet", callback_data='wallet')],
+    [InlineKeyboardButton("🎁 Donate", callback_data='donate')],
+    [InlineKeyboardButton("📊 My Impact", callback_data='my_stats')]
+])
+
+EARN_MARKUP = InlineKeyboardMarkup([
+    [InlineKeyboardButton("♻️ Recycle E-Waste", callback_data='recycle')],
+    [InlineKeyboardButton("📋 Create Task", callback_data='create_errand')],
+    [InlineKeyboardButton("📜 Available Tasks", callback_data='list_errands')],
+    [InlineKeyboardButton("✅ Complete Task", callback_data='complete_errand')],
+    [InlineKeyboardButton("🔙 Back to Main Menu", callback_data='main_menu')]
+])
+
+BUYER_MARKUP = InlineKeyboardMarkup([
+    [InlineKeyboardButton("📝 Register as Buyer", callback_data='register_buyer')],
+    [InlineKeyboardButton("🔍 Process E-Waste", callback_data='process_ewaste')],
+    [InlineKeyboardButton("💳 Pay for E-Waste", callback_data='pay_for_ewaste')],
+    [InlineKeyboardButton("🔙 Back to Main Menu", callback_data='main_menu')]
+])
+
+WALLET_MARKUP = InlineKeyboardMarkup([
+    [InlineKeyboardButton("🔄 Refresh Balance", callback_data='refresh_balance')],
+    [InlineKeyboardButton("💸 Transfer Tokens", callback_data='transfer_tokens')],
+    [InlineKeyboardButton("⛽ Get Free Gas", callback_data='claim_gas')],
+    [InlineKeyboardButton("🔙 Back to Main Menu", callback_data='main_menu')]
+])
+
+DONATE_MARKUP = InlineKeyboardMarkup([
+    [InlineKeyboardButton("💖 Donate to Project", callback_data='donate_project')],
+    [InlineKeyboardButton("🔙 Back to Main Menu", callback_data='main_menu')]
+])
+
+REGISTER_MARKUP = InlineKeyboardMarkup([
+    [InlineKeyboardButton("⛽ Get Free Gas", callback_data='claim_gas')],
+    [InlineKeyboardButton("🔑 Register on Blockchain", callback_data='register')]
+])
+
+REGISTER_ONLY_MARKUP = InlineKeyboardMarkup([
+    [InlineKeyboardButton("🔑 Register on Blockchain", callback_data='register')]
+])
+
+CLAIM_GAS_MARKUP = InlineKeyboardMarkup([
+    [InlineKeyboardButton("⛽ Get Free Gas", callback_data='claim_gas')]
+])
+
+CLAIM_GAS_RETRY_MARKUP = InlineKeyboardMarkup([
+    [InlineKeyboardButton("🔄 Try Again", callback_data='claim_gas')],
+    [InlineKeyboardButton("🔙 Back to Main Menu", callback_data='main_menu')]
+])
+
+BACK_TO_MAIN_MARKUP = InlineKeyboardMarkup([
+    [InlineKeyboardButton("🔙 Back to Main Menu", callback_data='main_menu')]
+])
+
+BACK_TO_EARN_MARKUP = InlineKeyboardMarkup([
+    [InlineKeyboardButton("🔙 Back to Earn Menu", callback_data='earn')]
+])
+
+
+def split_reply(text, count, from_right=False):
+    """Split an "a, b, c" reply into exactly count stripped fields; extra commas stay in the free-text field."""
+    # Free text comes first in "description, amount" replies, so those split from the right
+    fields = text.rsplit(',', count - 1) if from_right else text.split(',', count - 1)
+    if len(fields) != count:
+        raise ValueError(f"Expected {count} comma-separated values")
+    return [field.strip() for field in fields]
+
+
+# Menu texts shared by every path that shows the screen; show_main_menu compares against it to skip no-op edits
+MAIN_MENU_TEXT = "🏠 Main Menu - What would you like to do today?"
+
+# Reply templates for the most frequent screens, filled with %-formatting per call
+START_RETURN_TEMPLATE = (
+    "Welcome back! 👋\n\n"
+    "Your wallet: `%s`\n"
+    "KBT balance: `%s`\n"
+    "ETH balance: `%s`\n\n"
+    "Ready to make a difference? Let's get you registered on the blockchain!"
+)
+
+STATS_TEMPLATE = (
+    "📊 Your Impact Stats:\n\n"
+    "🌟 Reputation: %s\n"
+    "♻️ Total Recycled: %.2f kg\n"
+    "💰 KBT Balance: %s KBT\n\n"
+    "Wow! You're making a real difference. Keep it up! 🌍👏"
+)
+
+WALLET_TEMPLATE = (
+    "👛 Wallet Menu\n\n"
+    "Current balance: %s KBT\n\n"
+    "What would you like to do?"
+)
+
 
 # Helper functions
+@contextmanager
+def sqlite_connection():
+    """Check out a pooled sqlite3 connection directly, skipping SQLAlchemy's execution and result layers."""
+    connection = engine.raw_connection()
+    try:
+        yield connection.driver_connection
+    finally:
+        connection.close()
+
+
 def get_user(telegram_id):
-    """Retrieve user from database."""
-    session = Session()
-    user = session.query(User).filter_by(telegram_id=str(telegram_id)).first()
-    session.close()
-    return user
+    """Retrieve user from cache, falling back to the database."""
+    cached = _user_cache.get(telegram_id)
+    if cached:
+        return cached
+
+    with sqlite_connection() as connection:
+        row = connection.execute(USER_LOOKUP_SQL, (telegram_id,)).fetchone()
+    if row is None:
+        return None
+
+    wallet, encrypted_key = row
+    cached = CachedUser(telegram_id, AsyncWeb3.to_checksum_address(wallet), encrypted_key)
+
+    _user_cache[telegram_id] = cached
+    return cached
 
 
-def create_user(telegram_id, wallet_address, private_key):
+def create_user(telegram_id, wallet_address, encrypted_key):
     """Create a new user in the database."""
-    session = Session()
-    user = User(telegram_id=str(telegram_id), wallet_address=wallet_address, private_key=private_key)
-    session.add(user)
-    session.commit()
-    session.close()
+    wallet_address = AsyncWeb3.to_checksum_address(wallet_address)
+    with sqlite_connection() as connection:
+        connection.execute(USER_INSERT_SQL, (telegram_id, address_bytes(wallet_address), encrypted_key))
+        connection.commit()
+
+    cached = CachedUser(telegram_id, wallet_address, encrypted_key)
+    _user_cache[cached.telegram_id] = cached
+    return cached
+
+
+def set_user_password(telegram_id, hashed_password):
+    """Store a user's password hash with a single UPDATE on a pooled connection."""
+    with engine.begin() as connection:
+        connection.execute(USER_SET_PASSWORD, {"tid": telegram_id, "password": hashed_password})
+
+
+def load_nonce(telegram_id):
+    """Return the stored next nonce for a user's wallet, or None if it must be read from the node."""
+    with engine.connect() as connection:
+        return connection.execute(USER_NONCE, {"tid": telegram_id}).scalar_one_or_none()
+
+
+def store_nonce(telegram_id, nonce):
+    """Persist the next free nonce for a user's wallet; None clears it so the node is asked again."""
+    with engine.begin() as connection:
+        if nonce is None:
+            connection.execute(USER_CLEAR_NONCE, {"tid": telegram_id})
+        else:
+            connection.execute(USER_SET_NONCE, {"tid": telegram_id, "nonce": nonce})
+
+
+async def fetch_pending_nonce(address):
+    return await web3.eth.get_transaction_count(address, 'pending')
+
+
+# Next nonce per wallet, seeded from the database or the node's pending count and advanced locally after each send
+nonce_manager = NonceManager(fetch_pending_nonce, load_nonce, store_nonce)
+
+
+async def aget_user(telegram_id):
+    """Return a cached user, running the database lookup in a worker thread on a miss."""
+    return _user_cache.get(telegram_id) or await asyncio.to_thread(get_user, telegram_id)
+
+
+async def current_user(update, context):
+    """Return the user for this conversation, loading it once and keeping it in user_data."""
+    user = context.user_data.get('_user')
+    if user is None:
+        user = await aget_user(update.effective_user.id)
+        if user is not None:
+            context.user_data['_user'] = user
     return user
 
 
+def get_private_key(user):
+    """Decrypt a user's wallet key, keeping it in memory afterwards."""
+    private_key = _private_key_cache.get(user.telegram_id)
+    if private_key is None:
+        private_key = fernet.decrypt(user.encrypted_key)
+        _private_key_cache[user.telegram_id] = private_key
+    return private_key
+
+
+async def sign_and_send(transaction, user):
+    """Sign a transaction on a worker thread so ECDSA doesn't stall the event loop, then broadcast it."""
+    private_key = get_private_key(user)
+    signed_tx = await asyncio.to_thread(web3.eth.account.sign_transaction, transaction, private_key)
+    return await web3.eth.send_raw_transaction(signed_tx.raw_transaction)
+
+
+def is_nonce_error(error):
+    """Tell whether the node rejected a transaction because its nonce was out of step."""
+    if not isinstance(error, Web3RPCError):
+        return False
+    message = error.message.lower()
+    return 'nonce too low' in message or 'nonce too high' in message
+
+
+def describe_error(error):
+    """Turn a failed contract call or transaction into a reply for the user."""
+    if isinstance(error, ContractLogicError):
+        return f"The contract rejected this: {error.message or 'execution reverted'}"
+    if isinstance(error, TransactionNotFound):
+        return "Your transaction was dropped by the network before it was mined. Nothing was spent; please try again."
+    if isinstance(error, TimeExhausted):
+        return "Your transaction hasn't been confirmed yet. It may still go through, so check your balance before retrying."
+    if isinstance(error, Web3RPCError):
+        return f"The network rejected the transaction: {error.message}"
+    return f"An error occurred: {str(error)}"
+
+
+def eip1559_fees(fee_history):
+    """Derive EIP-1559 fee caps from eth_feeHistory: the median recent tip on top of twice the next base fee."""
+    tip = int(statistics.median(rewards[0] for rewards in fee_history['reward']))
+    base_fee = fee_history['baseFeePerGas'][-1]
+    return {'maxFeePerGas': base_fee * 2 + tip, 'maxPriorityFeePerGas': tip}
+
+
+async def fetch_fees():
+    """Read fresh EIP-1559 fee caps from the node."""
+    return eip1559_fees(await web3.eth.fee_history(5, 'latest', [50]))
+
+
+async def current_fees():
+    """Return EIP-1559 fee caps shared by every transaction for a few blocks, with one fetch in flight at a time."""
+    return await fee_reads.do('fees', fetch_fees)
+
+
+# Initialize GasTracker
+price_feed = web3.eth.contract(
+    address=AsyncWeb3.to_checksum_address(ETH_USD_FEED_ADDRESS), abi=load_abi_cached('contracts/price_feed.abi.json')
+) if ETH_USD_FEED_ADDRESS else None
+gas_tracker = GasTracker(web3, receipt_waiter, multicall, current_fees, FAUCET_ADDRESS, FAUCET_PRIVATE_KEY, price_feed)
+
+
+async def transact(function, user, params=None):
+    """Build, sign and send a contract call from the user's wallet with a locally tracked nonce."""
+    for attempt in range(2):
+        nonce = await nonce_manager.reserve(user)
+        try:
+            tx = await function.build_transaction({
+                'from': user.wallet_address, 'nonce': nonce, 'chainId': CHAIN_ID, **await current_fees(), **(params or {})
+            })
+        except Exception:
+            # Nothing reached the node, so the nonce can be handed out again
+            await nonce_manager.rollback(user, nonce)
+            raise
+        try:
+            tx_hash = await sign_and_send(tx, user)
+        except Exception as e:
+            # The node may be out of step with us; resync from it, retrying once if that was the problem
+            await nonce_manager.reset(user)
+            if attempt or not is_nonce_error(e):
+                raise
+            continue
+        await nonce_manager.confirm(user, nonce)
+        return tx_hash
+
+
+async def notify_when_mined(message, user, tx_hash, success, failure, touched=()):
+    """Wait for a submitted transaction in the background and report the outcome on its pending message."""
+    try:
+        receipt = await receipt_waiter.wait(tx_hash)
+        invalidate_balances(*touched)
+        if receipt.status == 1:
+            text = success(receipt) if callable(success) else success
+        else:
+            text = failure
+    except TransactionNotFound as e:
+        # Its nonce was never used, and later transactions would queue behind the gap; resync from the node
+        logger.error(f"Transaction {web3.to_hex(tx_hash)} was dropped")
+        if user is not None:
+            await nonce_manager.reset(user)
+        text = describe_error(e)
+    except Exception as e:
+        logger.error(f"Error waiting for transaction {web3.to_hex(tx_hash)}: {str(e)}")
+        text = describe_error(e)
+    try:
+        await message.edit_text(text)
+    except TelegramError:
+        # The pending message may be gone or no longer editable; post the outcome on its own instead
+        await message.get_bot().send_message(chat_id=message.chat_id, text=text)
+
+
+async def submit_and_notify(update, context, tx_hash, success, failure, touched=()):
+    """Acknowledge a submitted transaction right away and follow up once it is mined."""
+    message = await update.message.reply_text(
+        f"⏳ Transaction submitted: {web3.to_hex(tx_hash)}\n"
+        f"I'll update this message as soon as it's confirmed."
+    )
+    context.application.create_task(
+        notify_when_mined(message, context.user_data.get('_user'), tx_hash, success, failure, touched),
+        update=update
+    )
+
+
+def invalidate_balances(*addresses):
+    """Drop cached KBT balances and stats for wallets a mined transaction may have changed."""
+    for address in addresses:
+        if AsyncWeb3.is_address(address):
+            address = AsyncWeb3.to_checksum_address(address)
+            balance_reads.invalidate(address)
+            stats_reads.invalidate(address)
+
+
+async def get_token_balance(wallet_address):
+    """Return the KBT balance, reusing a recent value to absorb rapid refresh taps."""
+    return await balance_reads.do(wallet_address, lambda: balance_batcher.get(wallet_address))
+
+
 async def start(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Start the bot and guide user through registration process."""
-    user = get_user(update.effective_user.id)
+    user = await current_user(update, context)
+    if user and user.telegram_id in _registered_users:
+        return await show_main_menu(update, context)
     if user:
-        is_registered = contract.functions.users(user.wallet_address).call()[0]
-        if is_registered:
+        user_info, token_balance, eth_balance = await multicall.call(
+            FN_USERS(user.wallet_address),
+            FN_BALANCE_OF(user.wallet_address),
+            multicall.eth_balance(user.wallet_address)
+        )
+        balance_reads.put(user.wallet_address, token_balance)
+        if user_info[0]:
+            _registered_users.add(user.telegram_id)
             return await show_main_menu(update, context)
 
-        token_balance = contract.functions.balanceOf(user.wallet_address).call()
-        eth_balance = web3.eth.get_balance(user.wallet_address)
         eth_balance = float("{:.4f}".format(web3.from_wei(eth_balance, 'ether')))
 
         await update.message.reply_text(
-            f"Welcome back! 👋\n\n"
-            f"Your wallet: `{user.wallet_address}`\n"
-            f"KBT balance: `{token_balance}`\n"
-            f"ETH balance: `{eth_balance}`\n\n"
-            f"Ready to make a difference? Let's get you registered on the blockchain!",
-            reply_markup=InlineKeyboardMarkup([
-                [InlineKeyboardButton("⛽ Get Free Gas", callback_data='claim_gas')],
-                [InlineKeyboardButton("🔑 Register on Blockchain", callback_data='register')]
-            ])
+            START_RETURN_TEMPLATE % (user.wallet_address, token_balance, eth_balance),
+            reply_markup=REGISTER_MARKUP
         )
         return REGISTER
 
@@ -112,10 +649,7 @@ async def start(update: Update, context: ContextTypes.DEFAULT_TYPE):
         "2️⃣ You're in charge of your account activities.\n"
         "3️⃣ We respect your privacy.\n\n"
         "Ready to join the eco-friendly revolution?",
-        reply_markup=InlineKeyboardMarkup([
-            [InlineKeyboardButton("✅ I Agree", callback_data='agree')],
-            [InlineKeyboardButton("❌ I Disagree", callback_data='disagree')]
-        ])
+        reply_markup=TERMS_MARKUP
     )
     return TERMS
 async def register_user(update: Update, context: ContextTypes.DEFAULT_TYPE):
@@ -123,78 +657,160 @@ async def register_user(update: Update, context: ContextTypes.DEFAULT_TYPE):
     query = update.callback_query
     await query.answer()
 
-    user = get_user(query.from_user.id)
+    user = await current_user(update, context)
     wallet_address = user.wallet_address
 
     try:
         # Estimate gas for the registration
-        gas_estimate = contract.functions.registerUser().estimate_gas({'from': wallet_address})
+        gas_estimate = await FN_REGISTER_USER().estimate_gas({'from': wallet_address})
 
         # Ensure sufficient gas
-        if not gas_tracker.ensure_sufficient_gas(wallet_address, gas_estimate):
+        if not await gas_tracker.ensure_sufficient_gas(wallet_address, gas_estimate):
             await query.edit_message_text(
                 "Oops! You don't have enough gas for registration. Let's get you some first.",
-                reply_markup=InlineKeyboardMarkup([
-                    [InlineKeyboardButton("⛽ Get Free Gas", callback_data='claim_gas')]
-                ])
+                reply_markup=CLAIM_GAS_MARKUP
             )
             return REGISTER
 
-        # Proceed with registration
-        nonce = web3.eth.get_transaction_count(wallet_address)
-        chain_id = web3.eth.chain_id
-
-        transaction = contract.functions.registerUser().build_transaction({
-            'chainId': chain_id,
-            'gas': int(gas_estimate * 1.2),  # Add 20% buffer
-            'gasPrice': web3.eth.gas_price,
-            'nonce': nonce,
-        })
-
-        signed_txn = web3.eth.account.sign_transaction(transaction, private_key=user.private_key)
-        tx_hash = web3.eth.send_raw_transaction(signed_txn.raw_transaction)
-        tx_receipt = web3.eth.wait_for_transaction_receipt(tx_hash)
-
-        if tx_receipt['status'] == 1:
-            await query.edit_message_text(
-                "🎉 Congratulations! You're now registered on the blockchain.\n\n"
-                "Welcome to KyumaBlocks! Let's start making a difference together."
-            )
-            return await show_main_menu(update, context)
-        else:
-            raise Exception("Transaction failed")
+        # Hand the transaction off to the registration worker instead of holding the handler open
+        await registration_queue.put((query.from_user.id, wallet_address, query.message.chat_id, gas_estimate))
+        await query.edit_message_text(
+            "⏳ Registering you on the blockchain...\n\n"
+            "I'll message you as soon as the transaction is confirmed."
+        )
+        return MAIN_MENU
 
     except Exception as e:
         logger.error(f"Error in register_user: {str(e)}")
         await query.edit_message_text(
             f"Oops! Registration didn't work out: {str(e)}\n\n"
             "Let's try again later.",
-            reply_markup=InlineKeyboardMarkup([
-                [InlineKeyboardButton("🔙 Back to Main Menu", callback_data='main_menu')]
-            ])
+            reply_markup=BACK_TO_MAIN_MARKUP
         )
         return MAIN_MENU
 
 
+async def prime_nonces(wallet_addresses):
+    """Read the pending nonce of every wallet not tracked locally yet, in one JSON-RPC batch."""
+    missing = [address for address in dict.fromkeys(wallet_addresses) if not nonce_manager.known(address)]
+    if not missing:
+        return
+    async with web3.batch_requests() as batch:
+        for address in missing:
+            batch.add(web3.eth.get_transaction_count(address, 'pending'))
+        pending = await batch.async_execute()
+    for address, count in zip(missing, pending):
+        nonce_manager.seed(address, count)
+
+
+async def prefetch_registration_state(wallet_addresses):
+    """Fetch fee caps and any unknown pending nonces for a registration batch, both in flight together."""
+    fees, _ = await asyncio.gather(current_fees(), prime_nonces(wallet_addresses))
+    return fees
+
+
+async def send_registration(telegram_id, gas_estimate, fees):
+    """Sign and submit a registerUser transaction, returning its hash."""
+    user = await aget_user(telegram_id)
+    nonce = await nonce_manager.reserve(user)
+    try:
+        transaction = {
+            'to': CONTRACT_ADDRESS,
+            'data': REGISTER_USER_CALLDATA,
+            'chainId': CHAIN_ID,
+            'gas': int(gas_estimate * 1.2),  # Add 20% buffer
+            'nonce': nonce,
+            **fees,
+        }
+        tx_hash = await sign_and_send(transaction, user)
+    except Exception:
+        await nonce_manager.reset(user)
+        raise
+    await nonce_manager.confirm(user, nonce)
+    return tx_hash
+
+
+async def watch_registration(bot, telegram_id, chat_id, tx_hash):
+    """Wait for one submitted registration in the background and tell the user how it went."""
+    try:
+        if isinstance(tx_hash, Exception):
+            raise tx_hash
+        receipt = await receipt_waiter.wait(tx_hash)
+        if receipt['status'] == 1:
+            _registered_users.add(telegram_id)
+            await bot.send_message(
+                chat_id=chat_id,
+                text="🎉 Congratulations! You're now registered on the blockchain.\n\n"
+                     "Welcome to KyumaBlocks! Let's start making a difference together."
+            )
+            await bot.send_message(
+                chat_id=chat_id,
+                text=MAIN_MENU_TEXT,
+                reply_markup=MAIN_MENU_MARKUP
+            )
+            return
+        error = "Transaction failed"
+    except Exception as e:
+        error = e
+    try:
+        logger.error(f"Error registering user {telegram_id}: {str(error)}")
+        await bot.send_message(
+            chat_id=chat_id,
+            text=f"Oops! Registration didn't work out: {str(error)}\n\n"
+                 "Let's try again later.",
+            reply_markup=BACK_TO_MAIN_MARKUP
+        )
+    except Exception as e:
+        logger.error(f"Error in watch_registration: {str(e)}")
+
+
+async def keygen_worker():
+    """Keep the account pool topped up with freshly generated, already encrypted wallets."""
+    while True:
+        account = await asyncio.to_thread(Account.create)
+        await account_pool.put((account, encrypt_private_key(account.key)))
+
+
+async def registration_worker(bot):
+    """Drain queued registrations in small batches and hand each submission to a confirmation watcher."""
+    while True:
+        batch = [await registration_queue.get()]
+        while len(batch) < REGISTRATION_BATCH_SIZE:
+            try:
+                batch.append(registration_queue.get_nowait())
+            except asyncio.QueueEmpty:
+                break
+
+        try:
+            fees = await prefetch_registration_state([wallet_address for _, wallet_address, _, _ in batch])
+            tx_hashes = await asyncio.gather(
+                *(send_registration(telegram_id, gas_estimate, fees)
+                  for telegram_id, _, _, gas_estimate in batch),
+                return_exceptions=True
+            )
+        except Exception as e:
+            tx_hashes = [e] * len(batch)
+
+        # Confirmations are watched per user so the next batch can be signed while these are mined
+        for (telegram_id, _, chat_id, _), tx_hash in zip(batch, tx_hashes):
+            task = asyncio.create_task(watch_registration(bot, telegram_id, chat_id, tx_hash))
+            background_tasks.add(task)
+            task.add_done_callback(background_tasks.discard)
+            registration_queue.task_done()
+
+
 async def show_main_menu(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Display the main menu with all available options."""
-    keyboard = [
-        [InlineKeyboardButton("💰 Earn & Recycle", callback_data='earn')],
-        [InlineKeyboardButton("🛒 Buyer Zone", callback_data='buyer')],
-        [InlineKeyboardButton("👛 My Wallet", callback_data='wallet')],
-        [InlineKeyboardButton("🎁 Donate", callback_data='donate')],
-        [InlineKeyboardButton("📊 My Impact", callback_data='my_stats')]
-    ]
-    reply_markup = InlineKeyboardMarkup(keyboard)
-    message = "🏠 Main Menu - What would you like to do today?"
-
     if update.message:
-        await update.message.reply_text(message, reply_markup=reply_markup)
+        await update.message.reply_text(MAIN_MENU_TEXT, reply_markup=MAIN_MENU_MARKUP)
     elif update.callback_query:
-        await update.callback_query.edit_message_text(message, reply_markup=reply_markup)
+        # Telegram rejects no-op edits, so skip the call when the menu is already showing
+        current = update.callback_query.message
+        if current is None or current.text != MAIN_MENU_TEXT or current.reply_markup != MAIN_MENU_MARKUP:
+            await update.callback_query.edit_message_text(MAIN_MENU_TEXT, reply_markup=MAIN_MENU_MARKUP)
     else:
         user_id = update.effective_user.id if update.effective_user else context.user_data.get('user_id')
-        await context.bot.send_message(chat_id=user_id, text=message, reply_markup=reply_markup)
+        await context.bot.send_message(chat_id=user_id, text=MAIN_MENU_TEXT, reply_markup=MAIN_MENU_MARKUP)
 
     return MAIN_MENU
 
@@ -204,15 +820,7 @@ async def earn_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
     query = update.callback_query
     await query.answer()
 
-    keyboard = [
-        [InlineKeyboardButton("♻️ Recycle E-Waste", callback_data='recycle')],
-        [InlineKeyboardButton("📋 Create Task", callback_data='create_errand')],
-        [InlineKeyboardButton("📜 Available Tasks", callback_data='list_errands')],
-        [InlineKeyboardButton("✅ Complete Task", callback_data='complete_errand')],
-        [InlineKeyboardButton("🔙 Back to Main Menu", callback_data='main_menu')]
-    ]
-    reply_markup = InlineKeyboardMarkup(keyboard)
-    await query.edit_message_text("💰 Earn & Recycle - Choose an option:", reply_markup=reply_markup)
+    await query.edit_message_text("💰 Earn & Recycle - Choose an option:", reply_markup=EARN_MARKUP)
     return EARN
 
 
@@ -221,14 +829,7 @@ async def buyer_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
     query = update.callback_query
     await query.answer()
 
-    keyboard = [
-        [InlineKeyboardButton("📝 Register as Buyer", callback_data='register_buyer')],
-        [InlineKeyboardButton("🔍 Process E-Waste", callback_data='process_ewaste')],
-        [InlineKeyboardButton("💳 Pay for E-Waste", callback_data='pay_for_ewaste')],
-        [InlineKeyboardButton("🔙 Back to Main Menu", callback_data='main_menu')]
-    ]
-    reply_markup = InlineKeyboardMarkup(keyboard)
-    await query.edit_message_text("🛒 Buyer Zone - What would you like to do?", reply_markup=reply_markup)
+    await query.edit_message_text("🛒 Buyer Zone - What would you like to do?", reply_markup=BUYER_MARKUP)
     return BUYER
 
 
@@ -247,29 +848,24 @@ async def recycle_ewaste(update: Update, context: ContextTypes.DEFAULT_TYPE):
 
 async def process_recycle(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Process the e-waste recycling request."""
-    user = get_user(update.effective_user.id)
+    user = await current_user(update, context)
     try:
-        description, weight = update.message.text.split(',')
-        weight = float(weight.strip())
-
-        tx = contract.functions.recycleEWaste(description, int(weight * 1000)).build_transaction({
-            'from': user.wallet_address,
-            'nonce': web3.eth.get_transaction_count(user.wallet_address),
-        })
-        signed_tx = web3.eth.account.sign_transaction(tx, user.private_key)
-        tx_hash = web3.eth.send_raw_transaction(signed_tx.raw_transaction)
-        receipt = web3.eth.wait_for_transaction_receipt(tx_hash)
+        description, weight = split_reply(update.message.text, 2, from_right=True)
+        weight = float(weight)
 
-        if receipt.status == 1:
-            await update.message.reply_text(
+        tx_hash = await transact(FN_RECYCLE(description, int(weight * 1000)), user)
+        await submit_and_notify(
+            update, context, tx_hash,
+            (
                 f"🎉 Success! You've recycled {weight}kg of e-waste.\n"
                 f"Description: {description}\n\n"
                 f"Thank you for making a difference! 🌍"
-            )
-        else:
-            await update.message.reply_text("Oops! The recycling process didn't work. Please try again.")
+            ),
+            "Oops! The recycling process didn't work. Please try again.",
+            touched=(user.wallet_address,)
+        )
     except Exception as e:
-        await update.message.reply_text(f"An error occurred: {str(e)}")
+        await update.message.reply_text(describe_error(e))
     finally:
         return await show_main_menu(update, context)
 
@@ -289,93 +885,98 @@ async def create_errand(update: Update, context: ContextTypes.DEFAULT_TYPE):
 
 async def process_create_errand(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Process the task (errand) creation request."""
-    user = get_user(update.effective_user.id)
+    user = await current_user(update, context)
     try:
-        description, reward = update.message.text.split(',')
-        reward = int(reward.strip())
+        description, reward = split_reply(update.message.text, 2, from_right=True)
+        reward = int(reward)
 
-        user_balance = contract.functions.balanceOf(user.wallet_address).call()
+        user_balance = await get_token_balance(user.wallet_address)
         if user_balance < reward:
             await update.message.reply_text(f"Oops! You don't have enough tokens. Your balance: {user_balance} KBT")
             return await show_main_menu(update, context)
 
-        tx = contract.functions.createErrand(description, reward).build_transaction({
-            'from': user.wallet_address,
-            'nonce': web3.eth.get_transaction_count(user.wallet_address),
-        })
-        signed_tx = web3.eth.account.sign_transaction(tx, user.private_key)
-        tx_hash = web3.eth.send_raw_transaction(signed_tx.raw_transaction)
-        receipt = web3.eth.wait_for_transaction_receipt(tx_hash)
+        tx_hash = await transact(FN_CREATE_ERRAND(description, reward), user)
 
-        if receipt.status == 1:
-            errand_created_event = contract.events.ErrandCreated().process_receipt(receipt)
+        def created_message(receipt):
+            errand_created_event = EV_ERRAND_CREATED.process_receipt(receipt)
             if errand_created_event:
                 errand_id = errand_created_event[0]['args']['id']
-                await update.message.reply_text(
+                return (
                     f"🎉 Task created successfully!\n\n"
                     f"📌 Task ID: {errand_id}\n"
                     f"💰 Reward: {reward} KBT\n"
                     f"📝 Description: {description}\n\n"
                     f"Someone can now complete this task to earn the reward."
                 )
-            else:
-                await update.message.reply_text(
-                    f"✅ Task created successfully, but we couldn't retrieve the ID.\n"
-                    f"💰 Reward: {reward} KBT\n"
-                    f"📝 Description: {description}"
-                )
-        else:
-            await update.message.reply_text("Oops! Task creation failed. Please try again.")
+            return (
+                f"✅ Task created successfully, but we couldn't retrieve the ID.\n"
+                f"💰 Reward: {reward} KBT\n"
+                f"📝 Description: {description}"
+            )
+
+        await submit_and_notify(
+            update, context, tx_hash,
+            created_message,
+            "Oops! Task creation failed. Please try again.",
+            touched=(user.wallet_address,)
+        )
     except ValueError as ve:
         await update.message.reply_text(f"Invalid input: {str(ve)}\nPlease use the format: description, reward")
     except Exception as e:
         logging.error(f"Error in process_create_errand: {str(e)}")
-        await update.message.reply_text(f"An error occurred: {str(e)}")
+        await update.message.reply_text(describe_error(e))
     finally:
         return await show_main_menu(update, context)
 
 
+@lru_cache(maxsize=64)
+def errand_page_markup(page, has_more):
+    """Build the previous/next buttons for a page of open errands."""
+    nav = []
+    if page:
+        nav.append(InlineKeyboardButton("⬅️ Previous", callback_data=f'list_errands:{page - 1}'))
+    if has_more:
+        nav.append(InlineKeyboardButton("Next ➡️", callback_data=f'list_errands:{page + 1}'))
+    if not nav:
+        return BACK_TO_EARN_MARKUP
+    return InlineKeyboardMarkup([nav, *BACK_TO_EARN_MARKUP.inline_keyboard])
+
+
 async def list_errands(update: Update, context: ContextTypes.DEFAULT_TYPE):
     query = update.callback_query
     await query.answer()
+    # Page buttons carry the page number as "list_errands:<page>"
+    page = int(query.data.partition(':')[2] or 0)
 
     try:
-        total_errands = contract.functions.getErrandCount().call()
-        available_errands = []
-
-        for i in range(total_errands):
-            errand = contract.functions.getErrand(i).call()
-            if not errand[4]:  # If not completed
-                available_errands.append({
-                    'id': i,
-                    'description': errand[2],
-                    'reward': errand[3]
-                })
+        await errand_index.sync()
+        available_errands, has_more = await asyncio.to_thread(
+            errand_index.open_errands, page * ERRANDS_PER_PAGE, ERRANDS_PER_PAGE
+        )
 
         if available_errands:
             errand_list = "📋 Available Tasks:\n\n"
             for errand in available_errands:
-                errand_list += f"🔢 ID: {errand['id']}\n📝 Task: {errand['description']}\n💰 Reward: {errand['reward']} KBT\n\n"
+                errand_list += f"🔢 ID: {errand.id}\n📝 Task: {errand.description}\n💰 Reward: {errand.reward} KBT\n\n"
 
             await query.edit_message_text(
                 errand_list,
-                reply_markup=InlineKeyboardMarkup([
-                    [InlineKeyboardButton("🔙 Back to Earn Menu", callback_data='earn')]
-                ])
+                reply_markup=errand_page_markup(page, has_more)
+            )
+        elif page:
+            await query.edit_message_text(
+                "No more tasks on this page.",
+                reply_markup=errand_page_markup(page, False)
             )
         else:
             await query.edit_message_text(
                 "No tasks available at the moment. Why not create one? 😊",
-                reply_markup=InlineKeyboardMarkup([
-                    [InlineKeyboardButton("🔙 Back to Earn Menu", callback_data='earn')]
-                ])
+                reply_markup=BACK_TO_EARN_MARKUP
             )
     except Exception as e:
         await query.edit_message_text(
             f"Oops! We couldn't fetch the tasks: {str(e)}",
-            reply_markup=InlineKeyboardMarkup([
-                [InlineKeyboardButton("🔙 Back to Earn Menu", callback_data='earn')]
-            ])
+            reply_markup=BACK_TO_EARN_MARKUP
         )
     return EARN
 async def complete_errand(update: Update, context: ContextTypes.DEFAULT_TYPE):
@@ -390,39 +991,42 @@ async def complete_errand(update: Update, context: ContextTypes.DEFAULT_TYPE):
 
 async def process_complete_errand(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Process the task (errand) completion request."""
-    user = get_user(update.effective_user.id)
+    user = await current_user(update, context)
     try:
         errand_id = int(update.message.text)
 
-        errand = contract.functions.errands(errand_id).call()
+        # The errand read and the gas estimate are independent, so both RPCs go out together
+        complete = FN_COMPLETE_ERRAND(errand_id)
+        errand, gas_estimate = await asyncio.gather(
+            FN_GET_ERRAND(errand_id).call(),
+            complete.estimate_gas({'from': user.wallet_address}),
+            return_exceptions=True
+        )
+        if isinstance(errand, Exception):
+            raise errand
         if not errand[0]:
             raise ValueError("This task doesn't exist. Double-check the ID and try again.")
         if errand[4]:
             raise ValueError("This task has already been completed. Try another one!")
-
-        tx = contract.functions.completeErrand(errand_id).build_transaction({
-            'from': user.wallet_address,
-            'nonce': web3.eth.get_transaction_count(user.wallet_address),
-            'gas': 200000,
-            'gasPrice': web3.eth.gas_price
-        })
-        signed_tx = web3.eth.account.sign_transaction(tx, user.private_key)
-        tx_hash = web3.eth.send_raw_transaction(signed_tx.raw_transaction)
-        receipt = web3.eth.wait_for_transaction_receipt(tx_hash)
-
-        if receipt.status == 1:
-            reward = errand[3]
-            await update.message.reply_text(
+        if isinstance(gas_estimate, Exception):
+            raise gas_estimate
+
+        tx_hash = await transact(complete, user, {'gas': int(gas_estimate * 1.2)})  # Add 20% buffer
+        reward = errand[3]
+        await submit_and_notify(
+            update, context, tx_hash,
+            (
                 f"🎉 Congratulations! You've completed task {errand_id}.\n"
                 f"💰 You've earned {reward} KBT tokens!\n\n"
                 f"Keep up the great work! 👏"
-            )
-        else:
-            await update.message.reply_text("Oops! Something went wrong. Please try again.")
+            ),
+            "Oops! Something went wrong. Please try again.",
+            touched=(user.wallet_address,)
+        )
     except ValueError as ve:
         await update.message.reply_text(str(ve))
     except Exception as e:
-        await update.message.reply_text(f"An error occurred: {str(e)}")
+        await update.message.reply_text(describe_error(e))
     finally:
         return await show_main_menu(update, context)
 
@@ -440,29 +1044,24 @@ async def register_buyer(update: Update, context: ContextTypes.DEFAULT_TYPE):
 
 async def process_register_buyer(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Process the buyer registration request."""
-    user = get_user(update.effective_user.id)
+    user = await current_user(update, context)
     try:
-        name, location, additional_info = update.message.text.split(',')
-
-        tx = contract.functions.registerBuyer(name.strip(), location.strip(),
-                                              additional_info.strip()).build_transaction({
-            'from': user.wallet_address,
-            'nonce': web3.eth.get_transaction_count(user.wallet_address),
-        })
-        signed_tx = web3.eth.account.sign_transaction(tx, user.private_key)
-        tx_hash = web3.eth.send_raw_transaction(signed_tx.raw_transaction)
-        receipt = web3.eth.wait_for_transaction_receipt(tx_hash)
+        name, location, additional_info = split_reply(update.message.text, 3)
 
-        if receipt.status == 1:
-            await update.message.reply_text(
-                f"🎉 Congratulations, {name.strip()}!\n\n"
+        tx_hash = await transact(
+            FN_REGISTER_BUYER(name, location, additional_info), user
+        )
+        await submit_and_notify(
+            update, context, tx_hash,
+            (
+                f"🎉 Congratulations, {name}!\n\n"
                 f"You're now registered as a buyer. Welcome aboard! 🚀\n"
                 f"You can now process e-waste and contribute to our circular economy."
-            )
-        else:
-            await update.message.reply_text("Oops! Registration failed. Please try again.")
+            ),
+            "Oops! Registration failed. Please try again."
+        )
     except Exception as e:
-        await update.message.reply_text(f"An error occurred: {str(e)}")
+        await update.message.reply_text(describe_error(e))
     finally:
         return await show_main_menu(update, context)
 
@@ -478,27 +1077,22 @@ async def process_ewaste(update: Update, context: ContextTypes.DEFAULT_TYPE):
 
 async def process_process_ewaste(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Process the e-waste processing request."""
-    user = get_user(update.effective_user.id)
+    user = await current_user(update, context)
     try:
         ewaste_id = int(update.message.text)
 
-        tx = contract.functions.processEWaste(ewaste_id).build_transaction({
-            'from': user.wallet_address,
-            'nonce': web3.eth.get_transaction_count(user.wallet_address),
-        })
-        signed_tx = web3.eth.account.sign_transaction(tx, user.private_key)
-        tx_hash = web3.eth.send_raw_transaction(signed_tx.raw_transaction)
-        receipt = web3.eth.wait_for_transaction_receipt(tx_hash)
-
-        if receipt.status == 1:
-            await update.message.reply_text(
+        tx_hash = await transact(FN_PROCESS_EWASTE(ewaste_id), user)
+        await submit_and_notify(
+            update, context, tx_hash,
+            (
                 f"✅ E-waste with ID {ewaste_id} has been processed successfully!\n\n"
                 f"Thank you for contributing to a cleaner environment. 🌿"
-            )
-        else:
-            await update.message.reply_text("Oops! Processing failed. Please try again.")
+            ),
+            "Oops! Processing failed. Please try again.",
+            touched=(user.wallet_address,)
+        )
     except Exception as e:
-        await update.message.reply_text(f"An error occurred: {str(e)}")
+        await update.message.reply_text(describe_error(e))
     finally:
         return await show_main_menu(update, context)
 
@@ -516,29 +1110,24 @@ async def pay_for_ewaste(update: Update, context: ContextTypes.DEFAULT_TYPE):
 
 async def process_pay_for_ewaste(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Process the payment for e-waste."""
-    user = get_user(update.effective_user.id)
+    user = await current_user(update, context)
     try:
-        recycler_address, amount = update.message.text.split(',')
-        amount = int(amount.strip())
+        recycler_address, amount = split_reply(update.message.text, 2)
+        amount = int(amount)
 
-        tx = contract.functions.payForEWaste(recycler_address.strip(), amount).build_transaction({
-            'from': user.wallet_address,
-            'nonce': web3.eth.get_transaction_count(user.wallet_address),
-        })
-        signed_tx = web3.eth.account.sign_transaction(tx, user.private_key)
-        tx_hash = web3.eth.send_raw_transaction(signed_tx.raw_transaction)
-        receipt = web3.eth.wait_for_transaction_receipt(tx_hash)
-
-        if receipt.status == 1:
-            await update.message.reply_text(
+        tx_hash = await transact(FN_PAY(recycler_address, amount), user)
+        await submit_and_notify(
+            update, context, tx_hash,
+            (
                 f"✅ Payment successful!\n\n"
-                f"You've paid {amount} KBT to {recycler_address.strip()}.\n"
+                f"You've paid {amount} KBT to {recycler_address}.\n"
                 f"Thank you for supporting our recyclers! 🌟"
-            )
-        else:
-            await update.message.reply_text("Oops! Payment failed. Please try again.")
+            ),
+            "Oops! Payment failed. Please try again.",
+            touched=(user.wallet_address, recycler_address)
+        )
     except Exception as e:
-        await update.message.reply_text(f"An error occurred: {str(e)}")
+        await update.message.reply_text(describe_error(e))
     finally:
         return await show_main_menu(update, context)
 
@@ -546,31 +1135,27 @@ async def my_stats(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Display user's statistics and impact."""
     query = update.callback_query
     await query.answer()
-    user = get_user(query.from_user.id)
+    user = await current_user(update, context)
 
     try:
-        reputation = contract.functions.getUserReputation(user.wallet_address).call()
-        recycled_amount = contract.functions.getUserRecycledAmount(user.wallet_address).call()
-        token_balance = contract.functions.balanceOf(user.wallet_address).call()
-
-        stats_message = (
-            f"📊 Your Impact Stats:\n\n"
-            f"🌟 Reputation: {reputation}\n"
-            f"♻️ Total Recycled: {recycled_amount / 1000:.2f} kg\n"
-            f"💰 KBT Balance: {token_balance} KBT\n\n"
-            f"Wow! You're making a real difference. Keep it up! 🌍👏"
+        reputation, recycled_amount, token_balance = await stats_reads.do(
+            user.wallet_address,
+            lambda: multicall.call(
+                FN_REPUTATION(user.wallet_address),
+                FN_RECYCLED_AMOUNT(user.wallet_address),
+                FN_BALANCE_OF(user.wallet_address)
+            )
         )
+        balance_reads.put(user.wallet_address, token_balance)
 
         await query.edit_message_text(
-            stats_message,
-            reply_markup=InlineKeyboardMarkup(
-                [[InlineKeyboardButton("🔙 Back to Main Menu", callback_data='main_menu')]])
+            STATS_TEMPLATE % (reputation, recycled_amount / 1000, token_balance),
+            reply_markup=BACK_TO_MAIN_MARKUP
         )
     except Exception as e:
         await query.edit_message_text(
             f"Oops! We couldn't fetch your stats: {str(e)}",
-            reply_markup=InlineKeyboardMarkup(
-                [[InlineKeyboardButton("🔙 Back to Main Menu", callback_data='main_menu')]])
+            reply_markup=BACK_TO_MAIN_MARKUP
         )
     return MAIN_MENU
 
@@ -578,23 +1163,26 @@ async def wallet_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Handle wallet-related operations."""
     query = update.callback_query
     await query.answer()
-    user = get_user(query.from_user.id)
-    balance = contract.functions.balanceOf(user.wallet_address).call()
-    keyboard = [
-        [InlineKeyboardButton("🔄 Refresh Balance", callback_data='refresh_balance')],
-        [InlineKeyboardButton("💸 Transfer Tokens", callback_data='transfer_tokens')],
-        [InlineKeyboardButton("⛽ Get Free Gas", callback_data='claim_gas')],
-        [InlineKeyboardButton("🔙 Back to Main Menu", callback_data='main_menu')]
-    ]
-    reply_markup = InlineKeyboardMarkup(keyboard)
+    user = await current_user(update, context)
+    balance = await get_token_balance(user.wallet_address)
     await query.edit_message_text(
-        f"👛 Wallet Menu\n\n"
-        f"Current balance: {balance} KBT\n\n"
-        f"What would you like to do?",
-        reply_markup=reply_markup
+        WALLET_TEMPLATE % (balance,),
+        reply_markup=WALLET_MARKUP
     )
     return WALLET
 
+async def refresh_balance(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Re-read the wallet balance from the chain, bypassing the short-lived cache."""
+    query = update.callback_query
+    await query.answer()
+    user = await current_user(update, context)
+    # An explicit refresh means the user wants chain state, so the cached value has to go
+    balance_reads.forget(user.wallet_address)
+    text = WALLET_TEMPLATE % (await get_token_balance(user.wallet_address),)
+    if query.message is None or query.message.text != text:
+        await query.edit_message_text(text, reply_markup=WALLET_MARKUP)
+    return WALLET
+
 async def transfer_tokens(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Guide user through token transfer process."""
     query = update.callback_query
@@ -609,29 +1197,24 @@ async def transfer_tokens(update: Update, context: ContextTypes.DEFAULT_TYPE):
 
 async def process_transfer_tokens(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Process the token transfer request."""
-    user = get_user(update.effective_user.id)
+    user = await current_user(update, context)
     try:
-        recipient, amount = update.message.text.split(',')
-        amount = int(amount.strip())
-
-        tx = contract.functions.transfer(recipient.strip(), amount).build_transaction({
-            'from': user.wallet_address,
-            'nonce': web3.eth.get_transaction_count(user.wallet_address),
-        })
-        signed_tx = web3.eth.account.sign_transaction(tx, user.private_key)
-        tx_hash = web3.eth.send_raw_transaction(signed_tx.raw_transaction)
-        receipt = web3.eth.wait_for_transaction_receipt(tx_hash)
+        recipient, amount = split_reply(update.message.text, 2)
+        amount = int(amount)
 
-        if receipt.status == 1:
-            await update.message.reply_text(
+        tx_hash = await transact(FN_TRANSFER(recipient, amount), user)
+        await submit_and_notify(
+            update, context, tx_hash,
+            (
                 f"✅ Transfer successful!\n\n"
-                f"You've sent {amount} KBT to {recipient.strip()}.\n"
+                f"You've sent {amount} KBT to {recipient}.\n"
                 f"Transaction hash: {tx_hash.hex()}"
-            )
-        else:
-            await update.message.reply_text("Oops! Transfer failed. Please try again.")
+            ),
+            "Oops! Transfer failed. Please try again.",
+            touched=(user.wallet_address, recipient)
+        )
     except Exception as e:
-        await update.message.reply_text(f"An error occurred: {str(e)}")
+        await update.message.reply_text(describe_error(e))
     finally:
         return await wallet_handler(update, context)
 
@@ -639,16 +1222,11 @@ async def donate_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Handle donation process."""
     query = update.callback_query
     await query.answer()
-    keyboard = [
-        [InlineKeyboardButton("💖 Donate to Project", callback_data='donate_project')],
-        [InlineKeyboardButton("🔙 Back to Main Menu", callback_data='main_menu')]
-    ]
-    reply_markup = InlineKeyboardMarkup(keyboard)
     await query.edit_message_text(
         "🎁 Donation Menu\n\n"
         "Your support helps us continue our mission of responsible e-waste management.\n"
         "Every token counts! What would you like to do?",
-        reply_markup=reply_markup
+        reply_markup=DONATE_MARKUP
     )
     return DONATE
 
@@ -664,28 +1242,23 @@ async def donate_project(update: Update, context: ContextTypes.DEFAULT_TYPE):
 
 async def process_donate_project(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Process the donation request."""
-    user = get_user(update.effective_user.id)
+    user = await current_user(update, context)
     try:
         amount = int(update.message.text)
         project_address = CONTRACT_ADDRESS  # Donate to the contract address
 
-        tx = contract.functions.transfer(project_address, amount).build_transaction({
-            'from': user.wallet_address,
-            'nonce': web3.eth.get_transaction_count(user.wallet_address),
-        })
-        signed_tx = web3.eth.account.sign_transaction(tx, user.private_key)
-        tx_hash = web3.eth.send_raw_transaction(signed_tx.raw_transaction)
-        receipt = web3.eth.wait_for_transaction_receipt(tx_hash)
-
-        if receipt.status == 1:
-            await update.message.reply_text(
+        tx_hash = await transact(FN_TRANSFER(project_address, amount), user)
+        await submit_and_notify(
+            update, context, tx_hash,
+            (
                 f"🎉 Thank you for your generous donation of {amount} KBT!\n\n"
                 f"Your support means the world to us and helps create a cleaner future. 🌍"
-            )
-        else:
-            await update.message.reply_text("Oops! The donation didn't go through. Please try again.")
+            ),
+            "Oops! The donation didn't go through. Please try again.",
+            touched=(user.wallet_address,)
+        )
     except Exception as e:
-        await update.message.reply_text(f"An error occurred: {str(e)}")
+        await update.message.reply_text(describe_error(e))
     finally:
         return await show_main_menu(update, context)
 
@@ -695,20 +1268,18 @@ async def terms_response(update: Update, context: ContextTypes.DEFAULT_TYPE):
     await query.answer()
 
     if query.data == 'agree':
-        user = get_user(update.effective_user.id)
+        user = await current_user(update, context)
         if not user:
-            account = web3.eth.account.create()
-            context.user_data['wallet'] = account.address
-            create_user(update.effective_user.id, account.address, account.key.hex())
+            account, encrypted_key = await account_pool.get()
+            user = await asyncio.to_thread(create_user, update.effective_user.id, account.address, encrypted_key)
+            context.user_data['_user'] = user
+            _private_key_cache[user.telegram_id] = account.key
 
         await query.edit_message_text(
             f"🎉 Welcome aboard! Your wallet is ready.\n\n"
-            f"🔐 Wallet address: `{context.user_data['wallet']}`\n\n"
+            f"🔐 Wallet address: `{user.wallet_address}`\n\n"
             f"Let's get you started on your eco-friendly journey!",
-            reply_markup=InlineKeyboardMarkup([
-                [InlineKeyboardButton("⛽ Get Free Gas", callback_data='claim_gas')],
-                [InlineKeyboardButton("🔑 Register on Blockchain", callback_data='register')]
-            ])
+            reply_markup=REGISTER_MARKUP
         )
         return REGISTER
     else:
@@ -724,11 +1295,9 @@ async def set_password(update: Update, context: ContextTypes.DEFAULT_TYPE):
     user_id = update.effective_user.id
 
     try:
-        session = Session()
-        user = session.query(User).filter_by(telegram_id=str(user_id)).first()
-        user.password = password
-        session.commit()
-        session.close()
+        hashed_password = await asyncio.to_thread(password_hasher.hash, password)
+        await asyncio.to_thread(set_user_password, user_id, hashed_password)
+        context.user_data.pop('_user', None)
 
         await update.message.reply_text(
             "🎊 Password set successfully!\n\n"
@@ -747,38 +1316,22 @@ async def cancel(update: Update, context: ContextTypes.DEFAULT_TYPE):
     return await show_main_menu(update, context)
 
 async def button(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    """Handle button presses."""
+    """Handle button presses that no menu handler matched."""
     query = update.callback_query
     await query.answer()
+    await query.edit_message_text(text=f"Sorry, I didn't understand that command.")
+    return MAIN_MENU
 
-    handlers = {
-        'earn': earn_handler,
-        'buyer': buyer_handler,
-        'wallet': wallet_handler,
-        'donate': donate_handler,
-        'recycle': recycle_ewaste,
-        'create_errand': create_errand,
-        'complete_errand': complete_errand,
-        'my_stats': my_stats,
-        'main_menu': show_main_menu,
-        'list_errands': list_errands,
-        'claim_gas': claim_gas,
-    }
-
-    handler = handlers.get(query.data)
-    if handler:
-        return await handler(update, context)
-    else:
-        await query.edit_message_text(text=f"Sorry, I didn't understand that command.")
-        return MAIN_MENU
+async def main_menu_button(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Answer a Main Menu tap and show the menu."""
+    await update.callback_query.answer()
+    return await show_main_menu(update, context)
 
 async def handle_invalid_input(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Handle invalid user input."""
     await update.message.reply_text(
         "I didn't quite catch that. Let's head back to the main menu.",
-        reply_markup=InlineKeyboardMarkup([
-            [InlineKeyboardButton("🔙 Back to Main Menu", callback_data='main_menu')]
-        ])
+        reply_markup=BACK_TO_MAIN_MARKUP
     )
     return MAIN_MENU
 
@@ -789,9 +1342,7 @@ async def error_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
         if update.effective_message:
             await update.effective_message.reply_text(
                 "Oops! Something went wrong. Let's go back to the main menu.",
-                reply_markup=InlineKeyboardMarkup([
-                    [InlineKeyboardButton("🔙 Back to Main Menu", callback_data='main_menu')]
-                ])
+                reply_markup=BACK_TO_MAIN_MARKUP
             )
         return MAIN_MENU
     except Exception as e:
@@ -802,49 +1353,136 @@ async def claim_gas(update: Update, context: ContextTypes.DEFAULT_TYPE):
     query = update.callback_query
     await query.answer()
 
-    user = get_user(query.from_user.id)
-    result = gas_tracker.send_gas(user.wallet_address)
+    user = await current_user(update, context)
+    tx_hash = await gas_tracker.submit_gas(user.wallet_address)
 
-    if result:
+    if tx_hash:
+        message = await query.edit_message_text(
+            f"⛽ Gas is on its way!\n\n"
+            f"Transaction hash: `{web3.to_hex(tx_hash)}`\n\n"
+            f"I'll update this message as soon as it arrives."
+        )
+        context.application.create_task(confirm_gas_claim(message, tx_hash), update=update)
+    else:
         await query.edit_message_text(
+            "Oops! We couldn't send you gas right now. Please try again later.",
+            reply_markup=CLAIM_GAS_RETRY_MARKUP
+        )
+    return REGISTER
+
+
+async def confirm_gas_claim(message, tx_hash):
+    """Wait for a faucet transfer in the background and let the user register once it has landed."""
+    try:
+        receipt = await receipt_waiter.wait(tx_hash)
+        succeeded = receipt.status == 1
+    except Exception as e:
+        logger.error(f"Error waiting for gas transfer {web3.to_hex(tx_hash)}: {str(e)}")
+        succeeded = False
+
+    if succeeded:
+        await message.edit_text(
             f"🎉 Gas claimed successfully!\n\n"
-            f"Transaction hash: `{result}`\n\n"
+            f"Transaction hash: `{web3.to_hex(tx_hash)}`\n\n"
             f"You're now ready to register on the blockchain.",
-            reply_markup=InlineKeyboardMarkup([
-                [InlineKeyboardButton("🔑 Register on Blockchain", callback_data='register')]
-            ])
+            reply_markup=REGISTER_ONLY_MARKUP
         )
     else:
-        await query.edit_message_text(
+        await message.edit_text(
             "Oops! We couldn't send you gas right now. Please try again later.",
-            reply_markup=InlineKeyboardMarkup([
-                [InlineKeyboardButton("🔄 Try Again", callback_data='claim_gas')],
-                [InlineKeyboardButton("🔙 Back to Main Menu", callback_data='main_menu')]
-            ])
+            reply_markup=CLAIM_GAS_RETRY_MARKUP
         )
-    return REGISTER
+
+# callback_data -> handler; each is registered as its own CallbackQueryHandler, matched on the data
+# itself or on the data followed by ':' and an argument
+BUTTON_DISPATCH = {
+    'earn': earn_handler,
+    'buyer': buyer_handler,
+    'wallet': wallet_handler,
+    'donate': donate_handler,
+    'recycle': recycle_ewaste,
+    'create_errand': create_errand,
+    'complete_errand': complete_errand,
+    'my_stats': my_stats,
+    'main_menu': main_menu_button,
+    'list_errands': list_errands,
+    'claim_gas': claim_gas,
+    'refresh_balance': refresh_balance,
+    'transfer_tokens': transfer_tokens,
+    'donate_project': donate_project,
+    'register_buyer': register_buyer,
+    'process_ewaste': process_ewaste,
+    'pay_for_ewaste': pay_for_ewaste,
+}
+
+
+async def post_init(application: Application):
+    """Verify the node is reachable and start background workers before polling."""
+    global CHAIN_ID
+    # Reading the chain id doubles as the connectivity check: it raises if the node is unreachable
+    CHAIN_ID = await web3.eth.chain_id
+    # The first claim and transaction after boot would otherwise pay for the fee, nonce and price reads
+    await asyncio.gather(multicall.check_deployed(), current_fees(), gas_tracker.warm_up())
+
+    background_tasks.add(asyncio.create_task(receipt_waiter.run()))
+    background_tasks.add(asyncio.create_task(registration_worker(application.bot)))
+    background_tasks.add(asyncio.create_task(keygen_worker()))
+
+
+async def post_shutdown(application: Application):
+    """Stop background workers and close the RPC connection pool."""
+    for task in background_tasks:
+        task.cancel()
+    await asyncio.gather(*background_tasks, return_exceptions=True)
+    background_tasks.clear()
+    await web3.provider.disconnect()
+
 
 def main():
     """Set up and run the bot."""
-    application = Application.builder().token(BOT_TOKEN).build()
+    # libuv-backed event loop for the socket-heavy polling and RPC traffic; not available on Windows
+    try:
+        import uvloop
+        asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
+    except ImportError:
+        logger.info("uvloop not installed, using the default asyncio event loop")
+
+    application = (
+        Application.builder()
+        .token(BOT_TOKEN)
+        # Concurrent across chats, ordered within one, and a stalled chat can't pile up updates
+        .concurrent_updates(PerConversationUpdateProcessor(256, max_pending_per_conversation=3))
+        # Persistent HTTP/2 clients so TLS and TCP slow-start are paid once, not per poll
+        .request(KeepAliveHTTPXRequest(connection_pool_size=256, http_version="2"))
+        .get_updates_request(KeepAliveHTTPXRequest(connection_pool_size=8, http_version="2"))
+        # Shape outgoing calls to Telegram's limits instead of tripping 429 back-offs
+        .rate_limiter(AIORateLimiter(
+            overall_max_rate=30,
+            overall_time_period=1,
+            group_max_rate=20,
+            group_time_period=60,
+            # Honour Retry-After once or twice inside the limiter rather than failing the handler
+            max_retries=2,
+        ))
+        .post_init(post_init)
+        .post_shutdown(post_shutdown)
+        .build()
+    )
 
     conv_handler = ConversationHandler(
         entry_points=[CommandHandler('start', start)],
         states={
-            TERMS: [CallbackQueryHandler(terms_response)],
-            REGISTER: [CallbackQueryHandler(register_user)],
+            TERMS: [CallbackQueryHandler(terms_response, pattern='^(agree|disagree)$')],
+            # Only the register button; Get Free Gas on the same keyboard falls through to its menu handler
+            REGISTER: [CallbackQueryHandler(register_user, pattern='^register$')],
             PASSWORD: [MessageHandler(filters.TEXT & ~filters.COMMAND, set_password)],
-            MAIN_MENU: [CallbackQueryHandler(button)],
-            EARN: [CallbackQueryHandler(button)],
-            BUYER: [CallbackQueryHandler(button)],
-            WALLET: [
-                CallbackQueryHandler(button),
-                MessageHandler(filters.TEXT & ~filters.COMMAND, process_transfer_tokens)
-            ],
-            DONATE: [
-                CallbackQueryHandler(button),
-                MessageHandler(filters.TEXT & ~filters.COMMAND, process_donate_project)
-            ],
+            # Menu buttons in every state are served by the fallbacks below, so each state lists only
+            # what differs from them
+            MAIN_MENU: [],
+            EARN: [],
+            BUYER: [],
+            WALLET: [MessageHandler(filters.TEXT & ~filters.COMMAND, process_transfer_tokens)],
+            DONATE: [MessageHandler(filters.TEXT & ~filters.COMMAND, process_donate_project)],
             RECYCLE: [MessageHandler(filters.TEXT & ~filters.COMMAND, process_recycle)],
             CREATE_ERRAND: [MessageHandler(filters.TEXT & ~filters.COMMAND, process_create_errand)],
             COMPLETE_ERRAND: [MessageHandler(filters.TEXT & ~filters.COMMAND, process_complete_errand)],
@@ -852,18 +1490,21 @@ def main():
             PROCESS_EWASTE: [MessageHandler(filters.TEXT & ~filters.COMMAND, process_process_ewaste)],
             PAY_FOR_EWASTE: [MessageHandler(filters.TEXT & ~filters.COMMAND, process_pay_for_ewaste)],
         },
+        # Button taps are most of the traffic, so their handlers are checked first; PTB matches the
+        # compiled patterns itself, and button only answers taps none of them recognise
         fallbacks=[
+            *(CallbackQueryHandler(handler, pattern=f'^{data}(?::|$)') for data, handler in BUTTON_DISPATCH.items()),
+            CallbackQueryHandler(button),
             CommandHandler('cancel', cancel),
             CommandHandler('menu', show_main_menu),
             MessageHandler(filters.TEXT & ~filters.COMMAND, handle_invalid_input),
-            CallbackQueryHandler(button),
         ],
     )
 
     application.add_handler(conv_handler)
     application.add_error_handler(error_handler)
 
-    application.run_polling()
+    application.run_polling(poll_interval=0, timeout=30)
 
 if __name__ == '__main__':
     main()
\ No newline at end of file
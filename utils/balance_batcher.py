@@ -0,0 +1,50 @@
+import asyncio
+from web3.exceptions import ContractLogicError
+
+
+class BalanceBatcher:
+    def __init__(self, multicall, balance_of, window=0.03, max_batch=500):
+        self.multicall = multicall
+        self.balance_of = balance_of
+        self.window = window
+        self.max_batch = max_batch
+        self._waiting = {}
+        self._flush_task = None
+
+    async def get(self, address):
+        """Returns the token balance of an address, sharing one Multicall3 read with concurrent callers."""
+        future = self._waiting.get(address)
+        if future is None:
+            future = asyncio.get_running_loop().create_future()
+            self._waiting[address] = future
+            if self._flush_task is None:
+                self._flush_task = asyncio.create_task(self._flush_later())
+        return await asyncio.shield(future)
+
+    async def _flush_later(self):
+        # Collect every request that arrives within the window, then drain them together
+        await asyncio.sleep(self.window)
+        batch, self._waiting = self._waiting, {}
+        self._flush_task = None
+
+        addresses = list(batch)
+        chunks = [addresses[i:i + self.max_batch] for i in range(0, len(addresses), self.max_batch)]
+        try:
+            results = await asyncio.gather(
+                *(self.multicall.call(*(self.balance_of(address) for address in chunk)) for chunk in chunks)
+            )
+        except Exception as e:
+            for future in batch.values():
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        balances = [balance for chunk in results for balance in chunk]
+        for address, balance in zip(addresses, balances):
+            future = batch[address]
+            if future.done():
+                continue
+            if balance is None:
+                future.set_exception(ContractLogicError(f"balanceOf({address}) reverted"))
+            else:
+                future.set_result(balance)
@@ -0,0 +1,136 @@
+import asyncio
+import logging
+from eth_utils import event_abi_to_log_topic
+from sqlalchemy import select, update
+from sqlalchemy.dialects.sqlite import insert
+
+
+class ErrandIndex:
+    """Off-chain copy of the contract's errands in SQLite, kept current from ErrandCreated/ErrandCompleted logs."""
+
+    def __init__(self, web3, contract, multicall, engine, errands, sync_state,
+                 max_age=3.0, max_log_range=10_000, batch_size=500):
+        self.web3 = web3
+        self.contract = contract
+        self.multicall = multicall
+        self.engine = engine
+        self.errands = errands
+        self.sync_state = sync_state
+        self.max_age = max_age
+        self.max_log_range = max_log_range
+        self.batch_size = batch_size
+        self._created_topic = event_abi_to_log_topic(contract.events.ErrandCreated().abi)
+        self._completed_topic = event_abi_to_log_topic(contract.events.ErrandCompleted().abi)
+        self._get_errand = contract.functions.getErrand
+        self._get_errand_count = contract.functions.getErrandCount
+        self._synced_at = None
+        self._inflight = None
+
+    async def sync(self):
+        """Brings the index up to date unless it synced in the last max_age seconds; concurrent callers share one sync."""
+        loop = asyncio.get_running_loop()
+        if self._synced_at is not None and loop.time() - self._synced_at < self.max_age:
+            return
+        if self._inflight is None:
+            self._inflight = asyncio.ensure_future(self._sync())
+            self._inflight.add_done_callback(self._clear_inflight)
+        await asyncio.shield(self._inflight)
+
+    def _clear_inflight(self, _):
+        self._inflight = None
+
+    async def _sync(self):
+        last_block = await asyncio.to_thread(self._load_block)
+        started = asyncio.get_running_loop().time()
+        if last_block is None:
+            await self._rescan()
+        else:
+            # One round trip for the head and every errand log since the last sync; logs that land past the
+            # reported head are simply replayed next time, which is harmless since applying them is idempotent
+            async with self.web3.batch_requests() as batch:
+                batch.add(self.web3.eth.block_number)
+                batch.add(self.web3.eth.get_logs({
+                    'address': self.contract.address,
+                    'fromBlock': last_block + 1,
+                    'toBlock': 'latest',
+                    'topics': [[self._created_topic, self._completed_topic]],
+                }))
+                head, logs = await batch.async_execute()
+            if head - last_block > self.max_log_range:
+                # Nodes cap eth_getLogs ranges; after a long gap a full rescan is cheaper than paging logs
+                await self._rescan()
+            else:
+                await self._apply_logs(logs, head)
+        self._synced_at = started
+
+    async def _rescan(self):
+        # Take the head first: reads happen at or after it, and logs replayed from head+1 can only move
+        # errands forward, so nothing in between is lost
+        head, count = await asyncio.gather(self.web3.eth.block_number, self._get_errand_count().call())
+        logging.info(f"Rebuilding errand index: {count} errands at block {head}")
+        errands = await self._read(range(count))
+        await asyncio.to_thread(self._store, errands, (), head)
+
+    async def _apply_logs(self, logs, head):
+        created, completed = set(), set()
+        for log in logs:
+            errand_id = int.from_bytes(log['topics'][1], 'big')
+            (created if log['topics'][0] == self._created_topic else completed).add(errand_id)
+        # ErrandCreated carries no description, so new errands are read once from the contract
+        errands = await self._read(sorted(created))
+        await asyncio.to_thread(self._store, errands, completed, head)
+
+    async def _read(self, errand_ids):
+        errand_ids = list(errand_ids)
+        chunks = [errand_ids[i:i + self.batch_size] for i in range(0, len(errand_ids), self.batch_size)]
+        results = await asyncio.gather(
+            *(self.multicall.call_each(self._get_errand, ((i,) for i in chunk)) for chunk in chunks)
+        )
+        # Reads that revert come back as None and are left out of the index
+        return {
+            errand_id: errand
+            for errand_id, errand in zip(errand_ids, (errand for chunk in results for errand in chunk))
+            if errand is not None
+        }
+
+    def _load_block(self):
+        with self.engine.connect() as connection:
+            return connection.execute(
+                select(self.sync_state.c.block).where(self.sync_state.c.name == 'errands')
+            ).scalar_one_or_none()
+
+    def _store(self, errands, completed, head):
+        with self.engine.begin() as connection:
+            if errands:
+                rows = [
+                    {'id': errand_id, 'description': errand[2], 'reward': str(errand[3]), 'completed': errand[4]}
+                    for errand_id, errand in errands.items()
+                ]
+                statement = insert(self.errands)
+                connection.execute(statement.on_conflict_do_update(
+                    index_elements=['id'],
+                    set_={
+                        'description': statement.excluded.description,
+                        'reward': statement.excluded.reward,
+                        # Completion is one-way on-chain, so a stale read never reopens an errand
+                        'completed': self.errands.c.completed | statement.excluded.completed,
+                    },
+                ), rows)
+            if completed:
+                connection.execute(
+                    update(self.errands).where(self.errands.c.id.in_(completed)).values(completed=True)
+                )
+            statement = insert(self.sync_state).values(name='errands', block=head)
+            connection.execute(statement.on_conflict_do_update(index_elements=['name'], set_={'block': head}))
+
+    def open_errands(self, offset, limit):
+        """Returns up to limit open errands as (id, description, reward) rows from offset, and whether more follow."""
+        with self.engine.connect() as connection:
+            rows = connection.execute(
+                select(self.errands.c.id, self.errands.c.description, self.errands.c.reward)
+                .where(self.errands.c.completed.is_(False))
+                .order_by(self.errands.c.id)
+                .offset(offset)
+                .limit(limit + 1)
+            ).all()
+        return rows[:limit], len(rows) > limit
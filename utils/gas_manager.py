@@ -1,78 +1,160 @@
+import asyncio
 import logging
-from web3 import Web3
-from web3.exceptions import TransactionNotFound
+from utils.single_flight import SingleFlight
 
 class GasTracker:
-    def __init__(self, CHAINSTACK_NODE_URL, faucet_address, faucet_private_key):
-        self.web3 = Web3(Web3.HTTPProvider(CHAINSTACK_NODE_URL))
+    def __init__(self, web3, receipt_waiter, multicall, fees, faucet_address, faucet_private_key, price_feed=None):
+        # Shares the bot's AsyncWeb3 client and receipt poller, so faucet RPCs never block the event loop,
+        # and its cached EIP-1559 fee caps, so a claim doesn't read the gas price itself
+        self.web3 = web3
+        self.receipt_waiter = receipt_waiter
+        self.multicall = multicall
+        self.fees = fees
         self.faucet_address = faucet_address
         self.faucet_private_key = faucet_private_key
-        if self.web3.is_connected():
-            logging.info("Connected to Ethereum network")
-            self.chain_id = self.web3.eth.chain_id
-            logging.info(f"Chain ID: {self.chain_id}")
+
+        # ETH to USD rate from a Chainlink aggregator, re-read at most once a minute; the fixed rate is
+        # used when no feed is configured or the feed can't be read
+        self.price_feed = price_feed
+        self.eth_to_usd = 3000  # 1 ETH = $3000 USD (fallback value)
+        # $0.5 in wei, worked out in integers once per rate rather than through floats on every claim
+        self._fallback_amount = 5 * 10 ** 17 // self.eth_to_usd
+        self._eth_usd_reads = SingleFlight(ttl=60, maxsize=1)
+        self._feed_decimals = None
+
+        # The faucet's next nonce is tracked locally, so a claim only has to read the faucet balance;
+        # the lock keeps concurrent claims from sharing a nonce
+        self._nonce = None
+        self._lock = asyncio.Lock()
+
+        # A double-tapped claim reuses the first transfer instead of paying out twice
+        self.claim_ttl = 30
+        self._claims = SingleFlight(ttl=self.claim_ttl)
+
+    async def gas_amount_wei(self):
+        """Returns approximately $0.5 worth of ETH in wei at the price feed's rate, falling back to the fixed rate."""
+        if self.price_feed is None:
+            return self._fallback_amount
+        try:
+            return await self._eth_usd_reads.do('eth_usd', self._read_eth_usd)
+        except Exception as e:
+            logging.warning(f"Could not read ETH/USD price feed, using {self.eth_to_usd}: {str(e)}")
+            return self._fallback_amount
+
+    async def _read_eth_usd(self):
+        if self._feed_decimals is None:
+            answer, self._feed_decimals = await asyncio.gather(
+                self.price_feed.functions.latestAnswer().call(),
+                self.price_feed.functions.decimals().call(),
+            )
         else:
-            logging.error("Failed to connect to Ethereum network")
-            raise Exception("Failed to connect to Ethereum network")
+            answer = await self.price_feed.functions.latestAnswer().call()
+        if answer <= 0:
+            raise ValueError(f"feed answered {answer}")
+        # The feed answers USD per ETH scaled by 10**decimals
+        return 5 * 10 ** (17 + self._feed_decimals) // answer
+
+    async def warm_up(self):
+        """Reads the faucet nonce and the ETH/USD rate ahead of the first claim."""
+        async with self._lock:
+            if self._nonce is None:
+                self._nonce = await self.web3.eth.get_transaction_count(self.faucet_address, 'pending')
+        await self.gas_amount_wei()
 
-        # ETH to USD conversion rate (you should update this regularly in a real-world scenario)
-        self.eth_to_usd = 3000  # 1 ETH = $3000 USD (example value)
+    async def submit_gas(self, to_address):
+        """Submits approximately $0.5 worth of ETH for gas fees from the faucet address, returning the tx hash."""
+        # Repeat claims for an address share the transfer already in flight or sent in the last claim_ttl seconds
+        tx_hash = await self._claims.do(to_address, lambda: self._submit_gas(to_address))
+        if tx_hash is None:
+            # Nothing was sent, so the next claim should try again
+            self._claims.forget(to_address)
+        return tx_hash
 
-    def send_gas(self, to_address):
-        """Sends approximately $0.5 worth of ETH for gas fees from the faucet address."""
+    async def _submit_gas(self, to_address):
         try:
-            # Calculate 0.5 USD worth of ETH
-            gas_amount_eth = 0.5 / self.eth_to_usd
-            gas_amount_wei = self.web3.to_wei(gas_amount_eth, 'ether')
-
-            # Check faucet balance
-            faucet_balance = self.web3.eth.get_balance(self.faucet_address)
-            if faucet_balance < gas_amount_wei:
-                logging.error(f"Insufficient faucet balance. Need {gas_amount_eth} ETH, but only have {self.web3.from_wei(faucet_balance, 'ether')} ETH.")
-                return None
-
-            # Get the nonce
-            nonce = self.web3.eth.get_transaction_count(self.faucet_address)
-
-            # Estimate gas price
-            gas_price = self.web3.eth.gas_price
-            gas_limit = 21000  # Standard gas limit for a simple transfer
-
-            # Prepare the transaction
-            tx = {
-                'nonce': nonce,
-                'to': to_address,
-                'value': gas_amount_wei,
-                'gas': gas_limit,
-                'gasPrice': gas_price,
-                'chainId': self.chain_id  # Include chainId for EIP-155 compliance
-            }
+            gas_amount_wei = await self.gas_amount_wei()
+            fees = await self.fees()
+
+            async with self._lock:
+                # Faucet balance, plus the nonce when it isn't known, in one JSON-RPC batch
+                need_nonce = self._nonce is None
+                async with self.web3.batch_requests() as batch:
+                    batch.add(self.web3.eth.get_balance(self.faucet_address))
+                    if need_nonce:
+                        batch.add(self.web3.eth.get_transaction_count(self.faucet_address, 'pending'))
+                    results = list(await batch.async_execute())
+                faucet_balance = results.pop(0)
+                if need_nonce:
+                    self._nonce = results.pop(0)
+
+                if faucet_balance < gas_amount_wei:
+                    logging.error(f"Insufficient faucet balance. Need {self.web3.from_wei(gas_amount_wei, 'ether')} ETH, but only have {self.web3.from_wei(faucet_balance, 'ether')} ETH.")
+                    return None
 
-            # Sign the transaction
-            signed_tx = self.web3.eth.account.sign_transaction(tx, self.faucet_private_key)
+                gas_limit = 21000  # Standard gas limit for a simple transfer
 
-            # Send the transaction
-            tx_hash = self.web3.eth.send_raw_transaction(signed_tx.raw_transaction)
+                # Prepare a type-2 transaction, paying the going tip rather than a legacy gas price
+                tx = {
+                    'type': 2,
+                    'nonce': self._nonce,
+                    'to': to_address,
+                    'value': gas_amount_wei,
+                    'gas': gas_limit,
+                    **fees,
+                    # Include chainId for EIP-155 compliance; the provider caches it after the first read
+                    'chainId': await self.web3.eth.chain_id
+                }
 
-            # Wait for the transaction to be mined
-            tx_receipt = self.web3.eth.wait_for_transaction_receipt(tx_hash)
+                # Sign the transaction
+                signed_tx = self.web3.eth.account.sign_transaction(tx, self.faucet_private_key)
 
-            logging.info(f"Gas sent successfully. Amount: {gas_amount_eth} ETH. Hash: {tx_hash.hex()}")
-            return tx_hash.hex()
+                # Send the transaction; if the node turns it down, resync the nonce from the chain next time
+                try:
+                    tx_hash = await self.web3.eth.send_raw_transaction(signed_tx.raw_transaction)
+                except Exception:
+                    self._nonce = None
+                    raise
+                self._nonce += 1
+
+            logging.info(f"Gas submitted. Amount: {self.web3.from_wei(gas_amount_wei, 'ether')} ETH. Hash: {tx_hash.hex()}")
+            return tx_hash
         except Exception as e:
             logging.error(f"Error sending gas: {str(e)}")
             return None
 
+    async def await_gas_receipt(self, tx_hash):
+        """Waits for a submitted gas transfer to be mined and returns its receipt."""
+        return await self.receipt_waiter.wait(tx_hash)
+
+    async def send_gas(self, to_address):
+        """Sends gas to an address and waits until it has arrived, for callers that need the ETH right away."""
+        tx_hash = await self.submit_gas(to_address)
+        if tx_hash is None:
+            return None
+        try:
+            await self.await_gas_receipt(tx_hash)
+        except Exception as e:
+            logging.error(f"Error waiting for gas transfer {tx_hash.hex()}: {str(e)}")
+            return None
+        logging.info(f"Gas sent successfully. Hash: {tx_hash.hex()}")
+        return tx_hash.hex()
 
-    def get_balance(self, address):
+
+    async def get_balance(self, address):
         """Returns the ETH balance of the given address."""
-        balance_wei = self.web3.eth.get_balance(address)
+        balance_wei = await self.web3.eth.get_balance(address)
         return self.web3.from_wei(balance_wei, 'ether')
 
-    def estimate_gas(self, from_address, to_address, data=None):
+    async def get_balances(self, addresses):
+        """Returns the wei balances of several addresses, read in a single Multicall3 eth_call."""
+        if len(addresses) == 1:
+            return [await self.web3.eth.get_balance(addresses[0])]
+        return await self.multicall.eth_balances(addresses)
+
+    async def estimate_gas(self, from_address, to_address, data=None):
         """Estimates the gas required for a transaction."""
         try:
-            gas_estimate = self.web3.eth.estimate_gas({
+            gas_estimate = await self.web3.eth.estimate_gas({
                 'from': from_address,
                 'to': to_address,
                 'data': data
@@ -82,10 +164,19 @@ class GasTracker:
             logging.error(f"Error estimating gas: {str(e)}")
             return None
 
-    def ensure_sufficient_gas(self, address, required_gas):
+    async def ensure_sufficient_gas(self, address, required_gas):
         """Ensures the address has sufficient gas, sending more if needed."""
-        balance = self.get_balance(address)
-        required_eth = self.web3.from_wei(required_gas * self.web3.eth.gas_price, 'ether')
-        if balance < required_eth:
-            return self.send_gas(address)
-        return True
\ No newline at end of file
+        return (await self.ensure_sufficient_gas_many([address], required_gas))[0]
+
+    async def ensure_sufficient_gas_many(self, addresses, required_gas):
+        """Ensures every address has sufficient gas, topping up the short ones concurrently."""
+        balances, fees = await asyncio.gather(self.get_balances(addresses), self.fees())
+        # Transactions are sent with the shared fee caps, so that's the most an address can be charged
+        required_wei = required_gas * fees['maxFeePerGas']
+
+        async def top_up(address, balance):
+            if balance is not None and balance >= required_wei:
+                return True
+            return await self.send_gas(address)
+
+        return await asyncio.gather(*(top_up(a, b) for a, b in zip(addresses, balances)))
\ No newline at end of file
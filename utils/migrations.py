@@ -0,0 +1,90 @@
+import logging
+from sqlalchemy import inspect, text
+
+
+def rebuild_table(engine, table, casts=None):
+    """Recreate a table from its model when the on-disk layout differs, copying shared columns."""
+    inspector = inspect(engine)
+    if table.name not in inspector.get_table_names():
+        return False
+
+    existing_columns = [column['name'] for column in inspector.get_columns(table.name)]
+    existing_pk = inspector.get_pk_constraint(table.name)['constrained_columns']
+    model_columns = [column.name for column in table.columns]
+    model_pk = [column.name for column in table.primary_key.columns]
+    if set(existing_columns) == set(model_columns) and existing_pk == model_pk:
+        return False
+
+    casts = casts or {}
+    shared = [name for name in model_columns if name in existing_columns]
+    selected = [f"CAST({name} AS {casts[name]})" if name in casts else name for name in shared]
+    not_null = " AND ".join(f"{name} IS NOT NULL" for name in model_pk if name in shared) or "1"
+    legacy_name = f"{table.name}_legacy"
+
+    logging.info(f"Migrating table {table.name}: {existing_columns} -> {model_columns}")
+    with engine.begin() as connection:
+        connection.execute(text(f"ALTER TABLE {table.name} RENAME TO {legacy_name}"))
+        table.create(connection)
+        connection.execute(text(
+            f"INSERT INTO {table.name} ({', '.join(shared)}) "
+            f"SELECT {', '.join(selected)} FROM {legacy_name} WHERE {not_null}"
+        ))
+        connection.execute(text(f"DROP TABLE {legacy_name}"))
+    return True
+
+
+def fill_column(engine, table, source, target, convert):
+    """Add a model column missing on disk and populate it by converting a legacy column."""
+    inspector = inspect(engine)
+    if table.name not in inspector.get_table_names():
+        return False
+
+    existing_columns = [column['name'] for column in inspector.get_columns(table.name)]
+    if target in existing_columns or source not in existing_columns:
+        return False
+
+    pk = [column.name for column in table.primary_key.columns][0]
+    column_type = table.c[target].type.compile(engine.dialect)
+
+    logging.info(f"Migrating column {table.name}.{source} -> {target}")
+    with engine.begin() as connection:
+        connection.execute(text(f"ALTER TABLE {table.name} ADD COLUMN {target} {column_type}"))
+        rows = connection.execute(text(f"SELECT {pk}, {source} FROM {table.name} WHERE {source} IS NOT NULL")).all()
+        if rows:
+            connection.execute(
+                text(f"UPDATE {table.name} SET {target} = :value WHERE {pk} = :pk"),
+                [{"pk": row[0], "value": convert(row[1])} for row in rows]
+            )
+    return True
+
+
+def rewrite_column(engine, table, column, convert, should_convert):
+    """Convert the stored values of an existing column in place, for the rows the predicate picks."""
+    inspector = inspect(engine)
+    if table.name not in inspector.get_table_names():
+        return False
+
+    existing_columns = [info['name'] for info in inspector.get_columns(table.name)]
+    if column not in existing_columns:
+        return False
+
+    pk = [key.name for key in table.primary_key.columns][0]
+    with engine.begin() as connection:
+        rows = connection.execute(text(f"SELECT {pk}, {column} FROM {table.name} WHERE {column} IS NOT NULL")).all()
+        rows = [row for row in rows if should_convert(row[1])]
+        if not rows:
+            return False
+
+        logging.info(f"Migrating {len(rows)} values of {table.name}.{column}")
+        connection.execute(
+            text(f"UPDATE {table.name} SET {column} = :value WHERE {pk} = :pk"),
+            [{"pk": row[0], "value": convert(row[1])} for row in rows]
+        )
+    return True
+
+
+def vacuum(engine):
+    """Rewrite the database file so freed pages, and any plaintext left in them, are gone from disk."""
+    logging.info("Vacuuming database")
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as connection:
+        connection.exec_driver_sql("VACUUM")
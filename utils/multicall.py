@@ -0,0 +1,119 @@
+import logging
+from dataclasses import dataclass
+from functools import lru_cache
+from eth_utils import to_checksum_address
+from eth_utils.abi import get_abi_input_types, get_abi_output_types
+from web3._utils.abi import map_abi_data
+from web3._utils.normalizers import BASE_RETURN_NORMALIZERS
+
+MULTICALL3_ADDRESS = '0xcA11bde05977b3631167028862bE2a173976CA11'
+
+# Contracts return the same few creator and worker addresses over and over; checksumming is a keccak each time
+_checksum = lru_cache(maxsize=4096)(to_checksum_address)
+
+
+@dataclass(frozen=True)
+class _Codec:
+    selector: bytes
+    input_types: tuple
+    # Every argument is a uint256, so calldata is just the selector followed by 32-byte words
+    uint_words: bool
+    output_types: tuple
+    # Positions of top-level address outputs; None when nested types need web3's full normalizer pass
+    address_slots: tuple | None
+
+
+class Multicall:
+    def __init__(self, web3, abi, address=MULTICALL3_ADDRESS):
+        self.web3 = web3
+        self.contract = web3.eth.contract(address=address, abi=abi)
+        self._get_eth_balance = self.contract.functions.getEthBalance
+        self._try_aggregate = self.contract.functions.tryAggregate
+        self.deployed = True
+        self._codecs = {}
+
+    async def check_deployed(self):
+        """Checks for Multicall3 on this chain, falling back to JSON-RPC batches when it is missing."""
+        self.deployed = bool(await self.web3.eth.get_code(self.contract.address))
+        if not self.deployed:
+            logging.warning(f"Multicall3 not found at {self.contract.address}, batching reads as JSON-RPC requests")
+        return self.deployed
+
+    def eth_balance(self, address):
+        """Returns a bound call reading the native balance of an address, for use in a batch."""
+        return self._get_eth_balance(address)
+
+    async def eth_balances(self, addresses):
+        """Returns the native balances of several addresses in wei; reads that revert come back as None."""
+        return await self.call_each(self._get_eth_balance, ((address,) for address in addresses))
+
+    async def call(self, *functions):
+        """Runs bound contract reads in a single eth_call; reads that revert come back as None."""
+        if not self.deployed:
+            return await self._batch_call(functions)
+
+        codecs = [self._codec(fn) for fn in functions]
+        calls = [(fn.address, self._encode(codec, fn.args)) for fn, codec in zip(functions, codecs)]
+        return await self._aggregate(calls, codecs)
+
+    async def call_each(self, function, arg_tuples):
+        """Runs one read of the same contract function per argument tuple, binding and resolving its ABI once."""
+        arg_tuples = list(arg_tuples)
+        if not arg_tuples:
+            return []
+        if not self.deployed:
+            return await self._batch_call([function(*args) for args in arg_tuples])
+
+        codec = self._codec(function(*arg_tuples[0]))
+        calls = [(function.address, self._encode(codec, args)) for args in arg_tuples]
+        return await self._aggregate(calls, [codec] * len(calls))
+
+    async def _aggregate(self, calls, codecs):
+        results = await self._try_aggregate(False, calls).call()
+        return [
+            self._decode(codec, return_data) if success else None
+            for codec, (success, return_data) in zip(codecs, results)
+        ]
+
+    async def _batch_call(self, functions):
+        # Without Multicall3 the reads still share one HTTP POST, but a single revert fails the whole batch
+        async with self.web3.batch_requests() as batch:
+            for fn in functions:
+                if fn.address == self.contract.address and fn.fn_name == 'getEthBalance':
+                    batch.add(self.web3.eth.get_balance(*fn.args))
+                else:
+                    batch.add(fn)
+            return list(await batch.async_execute())
+
+    def _codec(self, fn):
+        # Parsing the ABI into types and a normalizer plan costs more than the call's own encoding, so do it once
+        key = (fn.address, fn.selector)
+        codec = self._codecs.get(key)
+        if codec is None:
+            output_types = tuple(get_abi_output_types(fn.abi))
+            simple = all(t.isalnum() for t in output_types)
+            codec = _Codec(
+                selector=bytes.fromhex(fn.selector[2:]),
+                input_types=tuple(get_abi_input_types(fn.abi)),
+                uint_words=all(t == 'uint256' for t in get_abi_input_types(fn.abi)),
+                output_types=output_types,
+                address_slots=tuple(i for i, t in enumerate(output_types) if t == 'address') if simple else None,
+            )
+            self._codecs[key] = codec
+        return codec
+
+    def _encode(self, codec, args):
+        if codec.uint_words:
+            return codec.selector + b''.join(arg.to_bytes(32, 'big') for arg in args)
+        return codec.selector + self.web3.codec.encode(codec.input_types, args)
+
+    def _decode(self, codec, return_data):
+        decoded = self.web3.codec.decode(codec.output_types, return_data)
+        if codec.address_slots is None:
+            decoded = map_abi_data(BASE_RETURN_NORMALIZERS, codec.output_types, decoded)
+        elif codec.address_slots:
+            decoded = list(decoded)
+            for i in codec.address_slots:
+                decoded[i] = _checksum(decoded[i])
+        # Match ContractFunction.call(): a single return value is unwrapped, several come back as a list
+        return decoded[0] if len(decoded) == 1 else list(decoded)
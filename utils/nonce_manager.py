@@ -0,0 +1,55 @@
+import asyncio
+
+
+class NonceManager:
+    """Hands out wallet nonces from memory, seeding each wallet once from the database or the node."""
+
+    def __init__(self, fetch_pending, load, store):
+        self.fetch_pending = fetch_pending
+        self.load = load
+        self.store = store
+        self._next = {}
+        self._seeding = {}
+
+    def known(self, address):
+        return address in self._next
+
+    def seed(self, address, nonce):
+        """Record a wallet's pending nonce read elsewhere, unless one is already being tracked."""
+        self._next.setdefault(address, nonce)
+
+    async def reserve(self, user):
+        """Returns the next nonce for a user's wallet; concurrent first calls share one seed read."""
+        address = user.wallet_address
+        if address not in self._next:
+            task = self._seeding.get(address)
+            if task is None:
+                task = asyncio.ensure_future(self._read(user))
+                self._seeding[address] = task
+                task.add_done_callback(lambda _: self._seeding.pop(address, None))
+            self.seed(address, await asyncio.shield(task))
+        nonce = self._next[address]
+        self._next[address] = nonce + 1
+        return nonce
+
+    async def _read(self, user):
+        stored = await asyncio.to_thread(self.load, user.telegram_id)
+        if stored is None:
+            stored = await self.fetch_pending(user.wallet_address)
+        return stored
+
+    async def confirm(self, user, nonce):
+        """Persist the nonce after one the node accepted, so a restart doesn't need to ask the node again."""
+        await asyncio.to_thread(self.store, user.telegram_id, nonce + 1)
+
+    async def rollback(self, user, nonce):
+        """Give back a nonce that was never broadcast, resyncing instead if a later one is already out."""
+        if self._next.get(user.wallet_address) == nonce + 1:
+            self._next[user.wallet_address] = nonce
+        else:
+            await self.reset(user)
+
+    async def reset(self, user):
+        """Forget a wallet's nonce so the next transaction resyncs from the node."""
+        self._next.pop(user.wallet_address, None)
+        await asyncio.to_thread(self.store, user.telegram_id, None)
@@ -0,0 +1,134 @@
+import asyncio
+import logging
+from web3 import AsyncWeb3, WebSocketProvider
+from web3.exceptions import TimeExhausted, TransactionNotFound
+
+
+class ReceiptWaiter:
+    def __init__(self, web3, poll_interval=1.0, timeout=120, ws_url=None, drop_after=30, drop_checks=3):
+        self.web3 = web3
+        self.poll_interval = poll_interval
+        self.timeout = timeout
+        self.ws_url = ws_url
+        # A transaction the node has forgotten this long after submission was dropped and will never be mined
+        self.drop_after = drop_after
+        self.drop_checks = drop_checks
+        self._pending = {}
+        self._submitted = {}
+        self._missing = {}
+        self._wakeup = asyncio.Event()
+        self._new_block = asyncio.Event()
+        self._heads_live = False
+
+    async def wait(self, tx_hash):
+        """Waits until the transaction is mined and returns its receipt."""
+        tx_hash = self.web3.to_hex(tx_hash)
+        future = self._pending.get(tx_hash)
+        if future is None:
+            loop = asyncio.get_running_loop()
+            future = loop.create_future()
+            self._pending[tx_hash] = future
+            self._submitted[tx_hash] = loop.time()
+            self._wakeup.set()
+
+        try:
+            return await asyncio.wait_for(asyncio.shield(future), self.timeout)
+        except asyncio.TimeoutError:
+            self._forget(tx_hash)
+            raise TimeExhausted(f"Transaction {tx_hash} is not in the chain after {self.timeout} seconds")
+
+    def _forget(self, tx_hash):
+        self._submitted.pop(tx_hash, None)
+        self._missing.pop(tx_hash, None)
+        return self._pending.pop(tx_hash, None)
+
+    async def run(self):
+        """Polls every pending transaction with one batched JSON-RPC request per tick."""
+        heads = asyncio.create_task(self._watch_heads()) if self.ws_url else None
+        try:
+            while True:
+                if not self._pending:
+                    self._wakeup.clear()
+                    await self._wakeup.wait()
+
+                await self._next_tick()
+                try:
+                    await self._poll()
+                except Exception as e:
+                    logging.error(f"Error polling transaction receipts: {str(e)}")
+        finally:
+            if heads:
+                heads.cancel()
+
+    async def _next_tick(self):
+        # With a live newHeads feed a receipt can only appear when a block does, so wait for one;
+        # otherwise fall back to polling on a fixed interval
+        if self._heads_live:
+            self._new_block.clear()
+            await self._new_block.wait()
+        else:
+            await asyncio.sleep(self.poll_interval)
+
+    async def _watch_heads(self):
+        while True:
+            try:
+                async with AsyncWeb3(WebSocketProvider(self.ws_url)) as ws_web3:
+                    await ws_web3.eth.subscribe('newHeads')
+                    self._heads_live = True
+                    logging.info("Subscribed to newHeads for receipt polling")
+                    async for _ in ws_web3.socket.process_subscriptions():
+                        self._new_block.set()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logging.error(f"newHeads subscription dropped: {str(e)}")
+            finally:
+                # Release a tick waiting on a block so polling carries on while we reconnect
+                self._heads_live = False
+                self._new_block.set()
+            await asyncio.sleep(self.poll_interval * 5)
+
+    async def _poll(self):
+        tx_hashes = list(self._pending)
+        if not tx_hashes:
+            return
+
+        # Transactions that have waited a while are also looked up, in the same batch, to catch dropped ones
+        now = asyncio.get_running_loop().time()
+        overdue = [tx_hash for tx_hash in tx_hashes if now - self._submitted.get(tx_hash, now) > self.drop_after]
+        responses = await self.web3.provider.make_batch_request(
+            [("eth_getTransactionReceipt", [tx_hash]) for tx_hash in tx_hashes]
+            + [("eth_getTransactionByHash", [tx_hash]) for tx_hash in overdue]
+        )
+        if not isinstance(responses, list):
+            raise ValueError(f"Unexpected batch response: {responses}")
+
+        lookups = dict(zip(overdue, responses[len(tx_hashes):]))
+        for tx_hash, response in zip(tx_hashes, responses):
+            if response.get('result') is None:
+                lookup = lookups.get(tx_hash)
+                if lookup is not None and 'error' not in lookup:
+                    if lookup.get('result') is None:
+                        self._drop_if_gone(tx_hash)
+                    else:
+                        self._missing.pop(tx_hash, None)
+                continue
+
+            future = self._forget(tx_hash)
+            if future is None or future.done():
+                continue
+
+            # Re-read the mined receipt through web3 so callers get the usual formatted AttributeDict
+            try:
+                future.set_result(await self.web3.eth.get_transaction_receipt(tx_hash))
+            except Exception as e:
+                future.set_exception(e)
+
+    def _drop_if_gone(self, tx_hash):
+        # Several misses in a row, so one lagging backend behind a load balancer doesn't fail a live transaction
+        self._missing[tx_hash] = self._missing.get(tx_hash, 0) + 1
+        if self._missing[tx_hash] < self.drop_checks:
+            return
+        future = self._forget(tx_hash)
+        if future is not None and not future.done():
+            future.set_exception(TransactionNotFound(f"Transaction {tx_hash} was dropped before it was mined"))
@@ -0,0 +1,99 @@
+import asyncio
+import contextvars
+import httpx
+import orjson
+from eth_utils import to_hex
+from hexbytes import HexBytes
+from web3 import AsyncHTTPProvider
+from web3._utils.batching import sort_batch_response_by_response_ids
+from web3.datastructures import AttributeDict
+from web3.providers.rpc.utils import ExceptionRetryConfiguration, check_if_retry_on_failure
+
+# web3 keeps batch mode as a single flag on the provider; scoping it to the current task stops a batch
+# open in one handler from capturing the calls other handlers make while it is in flight
+_batching = contextvars.ContextVar("rpc_batching", default=False)
+
+
+def _default(obj):
+    if isinstance(obj, AttributeDict):
+        return dict(obj)
+    if isinstance(obj, (HexBytes, bytes)):
+        return to_hex(obj)
+    raise TypeError
+
+
+class OrjsonAsyncHTTPProvider(AsyncHTTPProvider):
+    """AsyncHTTPProvider that frames JSON-RPC with orjson and posts it through one HTTP/2 httpx client."""
+
+    def __init__(self, endpoint_uri, max_connections=32, keepalive_expiry=300.0, **kwargs):
+        kwargs.setdefault("exception_retry_configuration", ExceptionRetryConfiguration(
+            errors=(httpx.TransportError, TimeoutError)
+        ))
+        super().__init__(endpoint_uri, **kwargs)
+        self._limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_connections,
+            keepalive_expiry=keepalive_expiry,
+        )
+        self._client = None
+
+    @property
+    def _is_batching(self):
+        return _batching.get()
+
+    @_is_batching.setter
+    def _is_batching(self, value):
+        _batching.set(value)
+
+    @property
+    def client(self):
+        # With HTTP/2 concurrent calls are multiplexed over a single TLS connection; HTTP/1.1 nodes get a pool
+        if self._client is None:
+            self._client = httpx.AsyncClient(http2=True, limits=self._limits, timeout=30.0)
+        return self._client
+
+    async def _post(self, request_data):
+        response = await self.client.post(self.endpoint_uri, content=request_data, headers=self.get_request_headers())
+        response.raise_for_status()
+        return response.content
+
+    async def _make_request(self, method, request_data):
+        retry = self.exception_retry_configuration
+        if retry is None or not check_if_retry_on_failure(method, retry.method_allowlist):
+            return await self._post(request_data)
+        for attempt in range(retry.retries):
+            try:
+                return await self._post(request_data)
+            except retry.errors:
+                if attempt == retry.retries - 1:
+                    raise
+                await asyncio.sleep(retry.backoff_factor * 2 ** attempt)
+
+    async def make_batch_request(self, batch_requests):
+        raw_response = await self._post(self.encode_batch_rpc_request(batch_requests))
+        return sort_batch_response_by_response_ids(self.decode_rpc_response(raw_response))
+
+    async def disconnect(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    def encode_rpc_request(self, method, params):
+        rpc_dict = {
+            "jsonrpc": "2.0",
+            "method": method,
+            "params": params or [],
+            "id": next(self.request_counter),
+        }
+        try:
+            return orjson.dumps(rpc_dict, default=_default)
+        except orjson.JSONEncodeError:
+            # Integers wider than 64 bits are outside orjson's range; the stdlib encoder handles them
+            return super().encode_rpc_request(method, params)
+
+    @staticmethod
+    def decode_rpc_response(raw_response):
+        try:
+            return orjson.loads(raw_response)
+        except orjson.JSONDecodeError:
+            return AsyncHTTPProvider.decode_rpc_response(raw_response)
@@ -0,0 +1,48 @@
+import asyncio
+from functools import partial
+from cachetools import TTLCache
+
+
+class SingleFlight:
+    """Shares one in-flight read per key among concurrent callers, keeping its result for ttl seconds."""
+
+    def __init__(self, ttl, maxsize=10_000):
+        self._results = TTLCache(maxsize=maxsize, ttl=ttl)
+        self._inflight = {}
+
+    async def do(self, key, factory):
+        """Returns the cached result for key, or awaits the one running factory() call for it."""
+        try:
+            return self._results[key]
+        except KeyError:
+            pass
+
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(factory())
+            self._inflight[key] = task
+            task.add_done_callback(partial(self._finish, key))
+        # Shielded so one caller giving up doesn't cancel the read for everyone else waiting on it
+        return await asyncio.shield(task)
+
+    def _finish(self, key, task):
+        failed = task.cancelled() or task.exception() is not None
+        if self._inflight.get(key) is not task:
+            # Invalidated while in flight; its answer may predate whatever changed the state
+            return
+        del self._inflight[key]
+        if not failed:
+            self._results[key] = task.result()
+
+    def put(self, key, value):
+        """Caches a value for key that was read some other way."""
+        self._results[key] = value
+
+    def forget(self, key):
+        """Drops the cached result for key; a read already in flight is still shared."""
+        self._results.pop(key, None)
+
+    def invalidate(self, key):
+        """Drops the cached result for key and detaches any read in flight, whose answer may now be stale."""
+        self._results.pop(key, None)
+        self._inflight.pop(key, None)
@@ -0,0 +1,23 @@
+import httpx
+from telegram.request import HTTPXRequest
+
+
+class KeepAliveHTTPXRequest(HTTPXRequest):
+    """HTTPXRequest that keeps idle Bot API connections open between calls."""
+
+    __slots__ = ("_keepalive_expiry",)
+
+    def __init__(self, *args, keepalive_expiry=60.0, **kwargs):
+        self._keepalive_expiry = keepalive_expiry
+        super().__init__(*args, **kwargs)
+
+    def _build_client(self):
+        # PTB sizes the pool but leaves httpx's 5s keep-alive expiry, which drops the
+        # TLS session between quiet polls; extend it so handshakes are paid once
+        limits = self._client_kwargs["limits"]
+        self._client_kwargs["limits"] = httpx.Limits(
+            max_connections=limits.max_connections,
+            max_keepalive_connections=limits.max_keepalive_connections,
+            keepalive_expiry=self._keepalive_expiry,
+        )
+        return super()._build_client()
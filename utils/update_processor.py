@@ -0,0 +1,65 @@
+import asyncio
+import logging
+from telegram import Update
+from telegram.ext import BaseUpdateProcessor
+
+BUSY_TEXT = "⏳ Still working on your previous request, please wait a moment."
+
+
+class PerConversationUpdateProcessor(BaseUpdateProcessor):
+    """Runs updates concurrently across conversations but in order within one, with a bounded backlog each."""
+
+    __slots__ = ("_max_pending", "_locks", "_pending")
+
+    def __init__(self, max_concurrent_updates, max_pending_per_conversation=3):
+        super().__init__(max_concurrent_updates)
+        self._max_pending = max_pending_per_conversation
+        self._locks = {}
+        self._pending = {}
+
+    @staticmethod
+    def _conversation_key(update):
+        # Same (chat, user) key ConversationHandler uses, so its state transitions never interleave
+        if not isinstance(update, Update) or update.effective_chat is None:
+            return None
+        user = update.effective_user
+        return update.effective_chat.id, user.id if user else None
+
+    async def do_process_update(self, update, coroutine):
+        key = self._conversation_key(update)
+        if key is None:
+            await coroutine
+            return
+
+        pending = self._pending.get(key, 0)
+        if pending >= self._max_pending:
+            # A slow RPC is holding this conversation up; turn the update away instead of queueing it
+            coroutine.close()
+            await self._reject(update)
+            return
+
+        self._pending[key] = pending + 1
+        lock = self._locks.setdefault(key, asyncio.Lock())
+        try:
+            async with lock:
+                await coroutine
+        finally:
+            self._pending[key] -= 1
+            if not self._pending[key]:
+                del self._pending[key]
+                del self._locks[key]
+
+    async def _reject(self, update):
+        try:
+            if update.callback_query:
+                await update.callback_query.answer(BUSY_TEXT)
+            elif update.effective_message:
+                await update.effective_message.reply_text(BUSY_TEXT)
+        except Exception as e:
+            logging.error(f"Error rejecting update {update.update_id}: {str(e)}")
+
+    async def initialize(self):
+        pass
+
+    async def shutdown(self):
+        pass